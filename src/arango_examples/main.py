@@ -1,10 +1,9 @@
 import os
 from dotenv import load_dotenv
 from google.cloud import language_v1
-from arango import ArangoClient
-from arango.exceptions import DatabaseCreateError, CollectionCreateError
 from datetime import datetime, timezone
 from random import randrange
+import arango_session
 
 load_dotenv()
 
@@ -17,23 +16,14 @@ class DocumentGraphExtractor:
             print(f"❌ Failed to initialize Google Language client: {e}")
             self.language_client = None
 
-        # Initialize ArangoDB client
+        # Connect to ArangoDB (shared connection pool, schema checked once per process)
         try:
-            self.arango_client = ArangoClient(hosts=os.getenv('ARANGO_HOST'))
-            self.sys_db = self.arango_client.db('_system', username=os.getenv('ARANGO_USER'), password=os.getenv('ARANGO_PASSWORD'))
+            self.db = arango_session.getDatabase(os.getenv('ARANGO_DB_NAME'))
         except Exception as e:
             print(f"❌ Failed to initialize ArangoDB client: {e}")
-            self.arango_client = None
+            self.db = None
 
-        # Create or connect to test database
-        try:
-            self.sys_db.create_database(os.getenv('ARANGO_DB_NAME'))
-        except DatabaseCreateError as e:
-            print(f"📝 Database {os.getenv('ARANGO_DB_NAME')} already exists")
-    
-        self.db = self.arango_client.db(os.getenv('ARANGO_DB_NAME'), username=os.getenv('ARANGO_USER'), password=os.getenv('ARANGO_PASSWORD'))
-
-        if self.language_client and self.arango_client:
+        if self.language_client and self.db:
             print(f"📝 DocumentGraphExtractor initialized")
     
     def analyze_document(self, document_text, doc_id):
@@ -99,18 +89,6 @@ class DocumentGraphExtractor:
         
         print(f"📝 storing the graph in the database")
 
-        # Create collections in the database
-        collections_to_create = [
-            ('documents', False),  # Document collection
-            ('entities', False),   # Another document collection
-            ('relationships', True)  # Edge collection for relationships
-        ]
-        for coll_name, is_edge in collections_to_create:
-            try:
-                self.db.create_collection(coll_name, edge=is_edge)
-            except CollectionCreateError:
-                print(f"📝 Collection {coll_name} already exists")
-
         # store the graph
         self.db.collection('documents').insert(graph_data['document'])
 
@@ -126,7 +104,8 @@ class DocumentGraphExtractor:
 if __name__ == "__main__":
     extractor = DocumentGraphExtractor()
 
-    with open('example.txt', 'r') as file:
+    # run from src: python3 -m arango_examples.main
+    with open(os.path.join(os.path.dirname(__file__), 'example.txt'), 'r') as file:
         sample_text = file.read()
 
     graph_data = extractor.analyze_document(sample_text, str(randrange(0,9999)))
@@ -0,0 +1,115 @@
+import os, threading
+from arango import ArangoClient
+from arango.http import DefaultHTTPClient
+from arango.exceptions import CollectionListError, DatabaseCreateError, CollectionCreateError
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# error code ArangoDB answers when the database does not exist
+DATABASE_NOT_FOUND = 1228
+
+# The graph collections every writer expects
+GRAPH_COLLECTIONS = [
+    ('documents', False),  # Document collection
+    ('entities', False),   # Another document collection
+    ('relationships', True)  # Edge collection for relationships
+]
+
+# One client and one database wrapper (so one HTTP connection pool) per database and process.
+# The schema is checked the first time a database is asked for, with a single probe
+# (listing its collections), and only what is missing gets created.
+_lock = threading.Lock()
+_client = None
+_databases = {}
+_collections = {}
+_indexes = {}
+
+def getClient():
+    global _client
+    if _client is None:
+        poolSize = int(os.getenv('ARANGO_POOL_SIZE', '16'))
+        _client = ArangoClient(hosts=os.getenv('ARANGO_HOST'),
+                               http_client=DefaultHTTPClient(pool_maxsize=poolSize))
+    return _client
+
+def connect(name):
+    return getClient().db(name, username=os.getenv('ARANGO_USER'), password=os.getenv('ARANGO_PASSWORD'))
+
+def getSystemDatabase():
+    with _lock:
+        if '_system' not in _databases:
+            _databases['_system'] = connect('_system')
+        return _databases['_system']
+
+def getDatabase(name=None, collections=GRAPH_COLLECTIONS, indexes=None):
+    name = name or os.getenv('ARANGO_DB_NAME')
+    with _lock:
+        if name not in _databases:
+            db = connect(name)
+            try:
+                _collections[name] = {collection['name'] for collection in db.collections()}
+            except CollectionListError as e:
+                if e.error_code != DATABASE_NOT_FOUND:
+                    raise
+                createDatabase(name)
+                _collections[name] = set()
+            _databases[name] = db
+        db = _databases[name]
+
+        for coll_name, is_edge in collections:
+            if coll_name in _collections[name]:
+                continue
+            try:
+                db.create_collection(coll_name, edge=is_edge)
+                print(f"✅ Created collection: {coll_name}")
+            except CollectionCreateError:
+                # created by another process in the meantime
+                pass
+            _collections[name].add(coll_name)
+
+        if indexes:
+            ensureIndexes(db, name, indexes)
+        return db
+
+def ensureIndexes(db, name, indexes):
+    # indexes is {collection: [fields, ...]}, each one a persistent index.
+    # One listing per collection and process, and only the missing indexes are created
+    # (in the background when the collection already has data, so writes are not blocked).
+    known = _indexes.setdefault(name, set())
+    for coll_name, field_lists in indexes.items():
+        missing = [fields for fields in field_lists if (coll_name, tuple(fields)) not in known]
+        if not missing:
+            continue
+        collection = db.collection(coll_name)
+        existing = {tuple(index['fields']) for index in collection.indexes() if index['type'] == 'persistent'}
+        populated = None
+        for fields in missing:
+            if tuple(fields) not in existing:
+                if populated is None:
+                    populated = collection.count() > 0
+                index = collection.add_index({
+                    'type': 'persistent',
+                    'fields': fields,
+                    'name': 'idx_' + '_'.join(fields),
+                    'inBackground': populated
+                })
+                if index.get('isNewlyCreated'):
+                    print(f"✅ Created index on {coll_name} {fields}")
+            known.add((coll_name, tuple(fields)))
+
+def createDatabase(name):
+    if '_system' not in _databases:
+        _databases['_system'] = connect('_system')
+    try:
+        _databases['_system'].create_database(name)
+        print(f"✅ Created database: {name}")
+    except DatabaseCreateError:
+        print(f"📝 Database {name} already exists")
+
+def forgetDatabase(name):
+    # after dropping a database, so it gets created again if asked for
+    with _lock:
+        _databases.pop(name, None)
+        _collections.pop(name, None)
+        _indexes.pop(name, None)
@@ -0,0 +1,51 @@
+import argparse, contextlib, os, tempfile, time
+from processOutput import ProcessOutput
+from storage.memory_store import MemoryGraphStore
+from benchmarks.synthetic import writeSyntheticJsonl
+
+# Compares docs/sec of the per-line ingestion against bulk ingestion, on a local ArangoDB
+# (a scratch database, dropped at the end, so the real graph is not touched) or on the
+# in-memory store, which measures the ingestion code alone, without the network.
+#
+#   % docker-compose up -d
+#   % cd src && python3 -m benchmarks.bench_bulk_ingestion --documents 2000 --batch-size 500
+#   % cd src && python3 -m benchmarks.bench_bulk_ingestion --backend memory
+
+def newProcessor(args):
+    if args.backend == 'memory':
+        return ProcessOutput(store=MemoryGraphStore())
+    po = ProcessOutput(dbName=args.db)
+    for name in ['documents', 'entities', 'relationships', 'ingestion_ledger']:
+        po.store.db.collection(name).truncate()
+    return po
+
+def timeIngestion(args, batchSize):
+    po = newProcessor(args)
+    started = time.perf_counter()
+    with open(os.devnull, 'w') as null, contextlib.redirect_stdout(null):
+        po.ingestOutput(path, batchSize=batchSize)
+    return time.perf_counter() - started, po.store.counts()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark per-line vs bulk ingestion")
+    parser.add_argument('--documents', type=int, default=2000)
+    parser.add_argument('--extractions', type=int, default=20, help='extractions per document')
+    parser.add_argument('--batch-size', type=int, default=500)
+    parser.add_argument('--backend', choices=['arango', 'memory'], default='arango')
+    parser.add_argument('--db', type=str, default='bench_ingestion', help='scratch database (dropped at the end)')
+    args = parser.parse_args()
+
+    path = writeSyntheticJsonl(os.path.join(tempfile.mkdtemp(), 'synthetic.jsonl'), args.documents, args.extractions)
+    try:
+        perLine, counts = timeIngestion(args, None)
+        print(f"per-line: {args.documents / perLine:8.1f} docs/s ({perLine:.2f}s)")
+
+        bulk, bulkCounts = timeIngestion(args, args.batch_size)
+        print(f"bulk({args.batch_size}): {args.documents / bulk:8.1f} docs/s ({bulk:.2f}s), {perLine / bulk:.1f}x faster")
+        print(f"stored: per-line {counts}, bulk {bulkCounts}")
+    finally:
+        if args.backend == 'arango':
+            import arango_session
+            arango_session.getSystemDatabase().delete_database(args.db)
+            arango_session.forgetDatabase(args.db)
+        os.remove(path)
@@ -0,0 +1,54 @@
+import argparse, contextlib, copy, os, time
+from graph_builder import GraphBuilder
+from benchmarks.synthetic import syntheticDocument
+
+# Micro-benchmark of building the graph of one document, GraphBuilder (key index)
+# against the previous linear scan over the entities added so far. Both build the same
+# graph with the same keys, only the duplicate check differs.
+#
+#   % cd src && python3 -m benchmarks.bench_graph_builder --sizes 10,1000,50000
+
+class ScannedKeys():
+    # stands in for GraphBuilder.entityKeys: `in` is an any() over the entities, as before
+    def __init__(self, builder):
+        self.builder = builder
+
+    def __contains__(self, key):
+        return any(entity['_key'] == key for entity in self.builder.entities)
+
+    def add(self, key):
+        pass
+
+class LinearScanBuilder(GraphBuilder):
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.entityKeys = ScannedKeys(self)
+
+def timeIt(build, line, repeat):
+    best = None
+    for _ in range(repeat):
+        copied = copy.deepcopy(line)
+        with open(os.devnull, 'w') as null, contextlib.redirect_stdout(null):
+            started = time.perf_counter()
+            build(copied)
+            elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark per-document graph building")
+    parser.add_argument('--sizes', type=str, default='10,1000,50000', help='extractions per synthetic document')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--max-linear', type=int, default=50000, help='skip the linear scan above this size')
+    args = parser.parse_args()
+
+    print(f"{'extractions':>12} {'builder':>12} {'linear scan':>12} {'speedup':>8}")
+    for size in [int(size) for size in args.sizes.split(',')]:
+        line = syntheticDocument(0, extractions=size)
+        builder = timeIt(GraphBuilder.fromAnnotatedDocument, line, args.repeat)
+        if size <= args.max_linear:
+            linear = timeIt(LinearScanBuilder.fromAnnotatedDocument, line, args.repeat)
+            print(f"{size:>12} {builder * 1000:>10.2f}ms {linear * 1000:>10.2f}ms {linear / builder:>7.1f}x")
+        else:
+            print(f"{size:>12} {builder * 1000:>10.2f}ms {'skipped':>12}")
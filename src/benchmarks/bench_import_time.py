@@ -0,0 +1,47 @@
+import argparse, os, re, subprocess, sys, time
+
+# Cold-start cost of the CLI and of the modules it loads, from `python -X importtime`:
+# wall time of each scenario (median of --repeat runs) and its slowest top-level imports.
+# Run it after touching imports, `main.py --help` should stay well under langextract's import time.
+#
+#   % cd src && python3 -m benchmarks.bench_import_time --repeat 5
+
+SRC = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCENARIOS = {
+    'main.py --help': ['main.py', '--help'],
+    'extractor registry': ['-c', 'from extractors import registry'],
+    'meds extractor class': ['-c', "from extractors import registry; registry.extractorClass('meds')"],
+    'dataset': ['-c', 'import dataset'],
+    'processOutput': ['-c', 'import processOutput'],
+}
+
+LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)')
+
+def run(arguments):
+    started = time.perf_counter()
+    completed = subprocess.run([sys.executable, '-X', 'importtime'] + arguments, cwd=SRC,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    elapsed = time.perf_counter() - started
+    # top-level imports (no indentation) and their cumulative time in microseconds
+    imports = []
+    for line in completed.stderr.splitlines():
+        match = LINE.match(line)
+        if match and len(match.group(3)) == 1:
+            imports.append((int(match.group(2)), match.group(4)))
+    return elapsed, imports
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the import time of the CLI")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--top', type=int, default=3, help='slowest top-level imports to show')
+    args = parser.parse_args()
+
+    print(f"{'scenario':<22} {'wall':>8} {'imports':>9}  slowest imports")
+    for name, arguments in SCENARIOS.items():
+        runs = [run(arguments) for _ in range(args.repeat)]
+        runs.sort(key=lambda result: result[0])
+        elapsed, imports = runs[len(runs) // 2]
+        total = sum(cumulative for cumulative, _ in imports)
+        slowest = ', '.join(f"{module} {cumulative / 1000:.0f}ms" for cumulative, module in sorted(imports, reverse=True)[:args.top])
+        print(f"{name:<22} {elapsed * 1000:>6.0f}ms {total / 1000:>7.0f}ms  {slowest}")
@@ -0,0 +1,70 @@
+import argparse, random, time
+import arango_session
+from storage.arango_store import COLLECTIONS, INDEXES
+from benchmarks.synthetic import MEDICATIONS, CONDITIONS, SYMPTOMS, ALIGNMENTS
+
+# Query latency by extraction_class, entity text, relationship_type, confidence and
+# alignment_status, before and after ProcessOutput's persistent indexes are created.
+# Uses (and drops at the end) a scratch database.
+#
+#   % docker-compose up -d
+#   % cd src && python3 -m benchmarks.bench_indexes --entities 100000
+
+QUERIES = {
+    'entities by class': ('FOR e IN entities FILTER e.extraction_class == @value LIMIT 100 RETURN e._key', 'condition'),
+    'entities by text': ('FOR e IN entities FILTER e.extraction_text == @value RETURN e._key', 'olanzapine 1234'),
+    'edges by type': ('FOR r IN relationships FILTER r.relationship_type == @value LIMIT 100 RETURN r._key', 'associated'),
+    'edges by confidence': ('FOR r IN relationships FILTER r.confidence >= @value LIMIT 100 RETURN r._key', 1),
+    'edges by alignment': ('FOR r IN relationships FILTER r.alignment_status == @value LIMIT 100 RETURN r._key', 'match_lesser'),
+    'count edges by alignment': ('RETURN LENGTH(FOR r IN relationships FILTER r.alignment_status == @value RETURN 1)', 'match_lesser'),
+}
+
+def load(db, entities, batch=10000):
+    rnd = random.Random(0)
+    classes = [('medication', MEDICATIONS), ('condition', CONDITIONS), ('symptom', SYMPTOMS)]
+    for start in range(0, entities, batch):
+        rows, edges = [], []
+        for i in range(start, min(start + batch, entities)):
+            extraction_class, vocabulary = rnd.choice(classes)
+            rows.append({'_key': f"e{i}", 'extraction_class': extraction_class,
+                         'extraction_text': f"{rnd.choice(vocabulary)} {i}"})
+            alignment = rnd.choice(ALIGNMENTS)
+            edges.append({'_from': f"documents/d{i // 20}", '_to': f"entities/e{i}",
+                          'relationship_type': rnd.choice(['extraction', 'extraction', 'associated']),
+                          'alignment_status': alignment, 'confidence': rnd.choice([0, 0.3, 0.6, 1])})
+        db.collection('entities').import_bulk(rows)
+        db.collection('relationships').import_bulk(edges)
+
+def measure(db, repeat):
+    timings = {}
+    for name, (query, value) in QUERIES.items():
+        samples = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            list(db.aql.execute(query, bind_vars={'value': value}))
+            samples.append(time.perf_counter() - started)
+        timings[name] = sorted(samples)[len(samples) // 2]
+    return timings
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark queries with and without the ingestion indexes")
+    parser.add_argument('--entities', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=9)
+    parser.add_argument('--db', type=str, default='bench_indexes', help='scratch database (dropped at the end)')
+    args = parser.parse_args()
+
+    # collections only, no indexes yet
+    db = arango_session.getDatabase(args.db, COLLECTIONS)
+    try:
+        print(f"loading {args.entities} entities and edges...")
+        load(db, args.entities)
+        before = measure(db, args.repeat)
+        arango_session.ensureIndexes(db, args.db, INDEXES)
+        after = measure(db, args.repeat)
+
+        print(f"{'query':<26} {'no index':>10} {'indexed':>10} {'speedup':>8}")
+        for name in QUERIES:
+            print(f"{name:<26} {before[name] * 1000:>8.2f}ms {after[name] * 1000:>8.2f}ms {before[name] / after[name]:>7.1f}x")
+    finally:
+        arango_session.getSystemDatabase().delete_database(args.db)
+        arango_session.forgetDatabase(args.db)
@@ -0,0 +1,132 @@
+import argparse, contextlib, os, resource, shutil, tempfile, threading, time
+from concurrent.futures import ThreadPoolExecutor
+from extractors import registry
+from processOutput import ProcessOutput
+from storage.memory_store import MemoryGraphStore
+from benchmarks.replay_provider import ReplayModel
+from benchmarks.synthetic import syntheticNote
+
+# End-to-end benchmark of the extraction pipeline without network: an extractor (with the
+# replay model in place of the LLM), saveResults, createHTMLResults and ingestOutput into the
+# in-memory graph, over N records. Reports docs/sec, p50/p95 latency per stage and peak memory.
+#
+# Record the responses once (calls the real model, needs the API key):
+#   % cd src && python3 -m benchmarks.bench_pipeline meds --records 20 --record
+# Then replay them as often as needed, with the provider latency of your choice:
+#   % cd src && python3 -m benchmarks.bench_pipeline meds --records 20 --latency 0.8 --jitter 0.3
+# Without the dataset or recordings, --synthetic notes answered from templates:
+#   % cd src && python3 -m benchmarks.bench_pipeline meds --records 200 --synthetic --missing template
+
+RECORDINGS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'recordings')
+STAGES = ['read_note', 'extract', 'save', 'html', 'ingest']
+
+class StageTimes():
+
+    def __init__(self):
+        self.samples = {stage: [] for stage in STAGES}
+        self.lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        started = time.perf_counter()
+        yield
+        with self.lock:
+            self.samples[name].append(time.perf_counter() - started)
+
+    def percentile(self, name, fraction):
+        ordered = sorted(self.samples[name])
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] if ordered else 0.0
+
+def newExtractor(args, models):
+    extractor = registry.newExtractor(args.type)
+    extractor.setBypassCache(True)
+    extractor.setChunking(args.max_char_buffer)
+
+    def replayModel(params, examples):
+        real = extractor.languageModel(params, examples) if args.record else None
+        model = ReplayModel(args.recordings, args.latency, args.jitter, real, args.missing)
+        models.append(model)
+        return model
+    extractor.setModelFactory(replayModel)
+    # replays don't count against the provider's limits, recordings do
+    extractor.setRateLimit(args.record)
+    return extractor
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline end-to-end benchmark of the extraction pipeline")
+    parser.add_argument('type', choices=registry.names())
+    parser.add_argument('--records', type=int, default=20, help='first N records of the dataset')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--recordings', type=str, help='JSON lines of recorded responses (default benchmarks/recordings/<type>.jsonl)')
+    parser.add_argument('--record', action='store_true', help='call the real model and record its responses')
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds added to every replayed response')
+    parser.add_argument('--jitter', type=float, default=0.0, help='+/- seconds of latency, fixed per prompt')
+    parser.add_argument('--missing', choices=['error', 'template'], default='error', help='prompts without a recording')
+    parser.add_argument('--synthetic', action='store_true', help='synthetic notes instead of the AGBonnet dataset')
+    parser.add_argument('--max-char-buffer', type=int, help="characters per chunk (default: the extractor's)")
+    args = parser.parse_args()
+
+    args.recordings = os.path.abspath(args.recordings or os.path.join(RECORDINGS, f"{args.type}.jsonl"))
+    if not args.record:
+        # the extractors check for a key, replays don't use it
+        os.environ.setdefault('OPENAI_API_KEY', 'replay')
+
+    # notes are read in the records' read_note stage, as main.py does
+    if args.synthetic:
+        readNote = syntheticNote
+    else:
+        from dataset import AGBonnetDataset
+        readNote = AGBonnetDataset(os.path.abspath('data')).getNote
+
+    # outputs go to a scratch directory, test_output is not touched
+    originalDir = os.getcwd()
+    workdir = tempfile.mkdtemp(prefix='bench_pipeline_')
+    os.chdir(workdir)
+    os.makedirs('test_output')
+
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        po = ProcessOutput(store=MemoryGraphStore())
+    times = StageTimes()
+    models = []
+    workerState = threading.local()
+    ingestLock = threading.Lock()
+
+    def processRecord(i):
+        if not hasattr(workerState, 'extractor'):
+            workerState.extractor = newExtractor(args, models)
+        extractor = workerState.extractor
+        with times.stage('read_note'):
+            extractor.setInputText(readNote(i))
+        with times.stage('extract'):
+            result = extractor.extract()
+        if not result:
+            raise RuntimeError(f"extraction failed for record {i}")
+        with times.stage('save'):
+            saved = extractor.saveResults(f"bench_{args.type}{i}")
+        with times.stage('html'):
+            extractor.createHTMLResults(f"bench_view_{args.type}{i}")
+        with ingestLock, times.stage('ingest'):
+            po.ingestOutput(saved)
+        return extractor.lastChunkStats['requests'] if extractor.lastChunkStats else 0
+
+    try:
+        started = time.perf_counter()
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            with ThreadPoolExecutor(max_workers=args.workers) as pool:
+                requests = sum(pool.map(processRecord, range(args.records)))
+        elapsed = time.perf_counter() - started
+    finally:
+        os.chdir(originalDir)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"{args.records} records, {requests} requests, {args.workers} workers: {elapsed:.2f}s, "
+          f"{args.records / elapsed:.2f} docs/sec, peak memory {peak:.0f} MB")
+    print(f"responses: {sum(m.replayed for m in models)} replayed, {sum(m.templated for m in models)} from templates, "
+          f"{sum(m.recorded for m in models)} recorded")
+    print(f"graph: {po.store.counts()}")
+    print(f"{'stage':<10} {'p50':>9} {'p95':>9} {'mean':>9}")
+    for stage in STAGES:
+        samples = times.samples[stage]
+        mean = sum(samples) / len(samples) if samples else 0.0
+        print(f"{stage:<10} {times.percentile(stage, 0.5) * 1000:>7.1f}ms {times.percentile(stage, 0.95) * 1000:>7.1f}ms {mean * 1000:>7.1f}ms")
@@ -0,0 +1,140 @@
+import argparse, asyncio, contextlib, json, os, threading, time, urllib.request, urllib.error
+from collections import deque
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from extractors import registry
+from extractors.rate_limiter import RateLimiter, setLimiter
+
+# Drives the rate limiter against a local stand-in endpoint that enforces RPM/TPM
+# over a sliding minute and answers 429 above it, like the providers do.
+#
+#   % cd src && python3 -m benchmarks.bench_rate_limiter --rpm 600 --tpm 60000 --duration 60
+#
+# With --extract, concurrent extractAsync calls of an extractor (langextract's OpenAI provider,
+# chunking, the limiter on every request) against the chat-completions stand-in of
+# benchmarks/openai_standin.py enforcing --rpm. Needs the openai package, no key or network.
+#
+#   % cd src && python3 -m benchmarks.bench_rate_limiter --extract meds --rpm 300 --duration 60
+
+class StandInEndpoint(BaseHTTPRequestHandler):
+    rpm, tpm, latency = 600, 60000, 0.2
+    lock = threading.Lock()
+    window = deque()  # (time, tokens) of the accepted requests
+    accepted, rejected = 0, 0
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        cls = type(self)
+        with cls.lock:
+            now = time.monotonic()
+            while cls.window and cls.window[0][0] < now - 60:
+                cls.window.popleft()
+            usedTokens = sum(tokens for _, tokens in cls.window)
+            if len(cls.window) + 1 > cls.rpm or usedTokens + body['tokens'] > cls.tpm:
+                cls.rejected += 1
+                status = 429
+            else:
+                cls.window.append((now, body['tokens']))
+                cls.accepted += 1
+                status = 200
+        if status == 200:
+            time.sleep(cls.latency)
+        self.send_response(status)
+        if status == 429:
+            self.send_header('retry-after', '1')
+        self.end_headers()
+        self.wfile.write(b'{}')
+
+    def log_message(self, *args):
+        pass
+
+class StandInError(Exception):
+    def __init__(self, status_code, response):
+        super().__init__(f"stand-in endpoint answered {status_code}")
+        self.status_code = status_code
+        self.response = response
+
+def post(url, tokens):
+    request = urllib.request.Request(url, data=json.dumps({'tokens': tokens}).encode(),
+                                     headers={'Content-Type': 'application/json'})
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.read()
+    except urllib.error.HTTPError as e:
+        raise StandInError(e.code, e) from e
+
+async def run(url, limiter, total, tokens):
+    async def one():
+        await limiter.run(lambda: asyncio.to_thread(post, url, tokens), 1, tokens, retries=20)
+    started = time.monotonic()
+    await asyncio.gather(*(one() for _ in range(total)))
+    return time.monotonic() - started
+
+async def extractAll(extractors, notes):
+    started = time.monotonic()
+    results = await asyncio.gather(*(extractor.extractAsync(note) for extractor, note in zip(extractors, notes)),
+                                   return_exceptions=True)
+    return time.monotonic() - started, sum(1 for result in results if isinstance(result, Exception) or not result)
+
+def runExtractions(args):
+    from benchmarks.openai_standin import ChatCompletionsStandIn, serve
+    from benchmarks.synthetic import syntheticNote
+
+    # the stand-in enforces the RPM only, the limiter aims for it with a TPM that never binds
+    ChatCompletionsStandIn.configure(latency=args.latency, sigma=0.1, rpm=args.rpm)
+    server, url = serve()
+    os.environ.setdefault('OPENAI_API_KEY', 'standin')
+
+    def newExtractor():
+        extractor = registry.newExtractor(args.extract)
+        extractor.setBaseUrl(url)
+        extractor.setBypassCache(True)
+        return extractor
+
+    probe = newExtractor()
+    modelId = probe.extractionParams()['model_id']
+    limiter = setLimiter(modelId, RateLimiter(args.rpm, 10 ** 9, maxInFlight=args.in_flight, headroom=args.headroom))
+    ceiling = args.rpm / 60
+    perNote, _ = probe.estimateUsage(syntheticNote(0))
+    notes = [syntheticNote(i) for i in range(max(1, int(ceiling * args.duration / perNote)))]
+    print(f"extracting {len(notes)} notes (~{perNote} requests each), stand-in ceiling {ceiling:.2f} req/s...")
+
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        elapsed, failed = asyncio.run(extractAll([newExtractor() for _ in notes], notes))
+    server.shutdown()
+
+    statuses = dict(sorted(ChatCompletionsStandIn.statuses.items()))
+    accepted = statuses.get(200, 0)
+    print(f"{len(notes) - failed} extractions ({failed} failed), sustained {accepted / elapsed:.2f} req/s "
+          f"({100 * accepted / elapsed / ceiling:.0f}% of the ceiling) in {elapsed:.1f}s")
+    print(f"stand-in responses: {statuses}, limiter backoffs: {limiter.throttles}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure sustained requests/sec of the rate limiter against a local stand-in")
+    parser.add_argument('--rpm', type=int, default=600, help='requests per minute the stand-in allows')
+    parser.add_argument('--tpm', type=int, default=60000, help='tokens per minute the stand-in allows')
+    parser.add_argument('--tokens', type=int, default=80, help='tokens per request')
+    parser.add_argument('--latency', type=float, default=0.2, help='seconds the stand-in takes per request')
+    parser.add_argument('--in-flight', type=int, default=16, help='max requests in flight')
+    parser.add_argument('--duration', type=int, default=60, help='approximate seconds to run')
+    parser.add_argument('--headroom', type=float, default=0.9, help='fraction of the limits the limiter aims for')
+    parser.add_argument('--extract', choices=registry.names(), help='run extractions of this type against the chat-completions stand-in')
+    args = parser.parse_args()
+
+    if args.extract:
+        runExtractions(args)
+        raise SystemExit
+
+    StandInEndpoint.rpm, StandInEndpoint.tpm, StandInEndpoint.latency = args.rpm, args.tpm, args.latency
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StandInEndpoint)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/"
+
+    limiter = RateLimiter(args.rpm, args.tpm, maxInFlight=args.in_flight, headroom=args.headroom)
+    ceiling = min(args.rpm, args.tpm / args.tokens) / 60
+    total = int(ceiling * args.duration)
+    print(f"sending {total} requests, provider ceiling {ceiling:.2f} req/s...")
+    elapsed = asyncio.run(run(url, limiter, total, args.tokens))
+    server.shutdown()
+
+    print(f"sustained {total / elapsed:.2f} req/s ({100 * total / elapsed / ceiling:.0f}% of the ceiling) in {elapsed:.1f}s")
+    print(f"429 responses: {StandInEndpoint.rejected}, limiter backoffs: {limiter.throttles}")
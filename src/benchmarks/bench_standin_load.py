@@ -0,0 +1,75 @@
+import argparse, contextlib, os, time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from extractors import registry
+from benchmarks.openai_standin import ChatCompletionsStandIn, serve, addArguments, configureFrom
+from benchmarks.synthetic import syntheticNote
+
+# Throughput and tail latency of the real extraction path (langextract's OpenAI provider,
+# its retries, our chunking) against the local chat-completions stand-in, with the latency,
+# 429s and 5xx you give it. Needs the openai package, no key or network.
+#
+#   % cd src && python3 -m benchmarks.bench_standin_load meds --records 100 --workers 8 --latency 0.8 --rate-429 0.05
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] if ordered else 0.0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load-test the extraction path against a local OpenAI stand-in")
+    parser.add_argument('type', choices=registry.names())
+    parser.add_argument('--records', type=int, default=50)
+    parser.add_argument('--workers', type=int, default=4, help='extractions running at the same time')
+    parser.add_argument('--chunk-workers', type=int, help="requests in flight per extraction (default: the extractor's)")
+    parser.add_argument('--max-char-buffer', type=int, help="characters per chunk (default: the extractor's)")
+    parser.add_argument('--synthetic', action='store_true', help='synthetic notes instead of the AGBonnet dataset')
+    addArguments(parser)
+    args = parser.parse_args()
+
+    if args.synthetic:
+        notes = [syntheticNote(i) for i in range(args.records)]
+    else:
+        from dataset import AGBonnetDataset
+        dataset = AGBonnetDataset()
+        notes = [dataset.getNote(i) for i in range(args.records)]
+
+    configureFrom(args)
+    server, url = serve()
+    os.environ.setdefault('OPENAI_API_KEY', 'standin')
+
+    def extract(i):
+        extractor = registry.newExtractor(args.type)
+        extractor.setBaseUrl(url)
+        extractor.setBypassCache(True)
+        extractor.setChunking(args.max_char_buffer, None, args.chunk_workers, None)
+        extractor.setInputText(notes[i])
+        started = time.perf_counter()
+        result = extractor.extract()
+        if not result:
+            raise RuntimeError(f"extraction failed for record {i}")
+        return time.perf_counter() - started, extractor.lastChunkStats
+
+    latencies, chunkStats, failed = [], [], 0
+    started = time.perf_counter()
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        with ThreadPoolExecutor(max_workers=args.workers) as pool:
+            for future in as_completed([pool.submit(extract, i) for i in range(args.records)]):
+                try:
+                    latency, stats = future.result()
+                    latencies.append(latency)
+                    chunkStats.append(stats)
+                except Exception:
+                    failed += 1
+    elapsed = time.perf_counter() - started
+    server.shutdown()
+
+    statuses = dict(sorted(ChatCompletionsStandIn.statuses.items()))
+    requests = sum(statuses.values())
+    print(f"{len(latencies)} extractions ({failed} failed) in {elapsed:.1f}s with {args.workers} workers: "
+          f"{len(latencies) / elapsed:.2f} docs/sec, {requests / elapsed:.1f} requests/sec")
+    print(f"stand-in responses: {statuses}")
+    print(f"extraction latency p50 {percentile(latencies, 0.5):.2f}s, p95 {percentile(latencies, 0.95):.2f}s, "
+          f"p99 {percentile(latencies, 0.99):.2f}s, max {max(latencies, default=0):.2f}s")
+    if chunkStats:
+        print(f"requests per note {sum(stats['requests'] for stats in chunkStats) / len(chunkStats):.1f}, "
+              f"request latency worst p95 {max(stats['p95'] for stats in chunkStats):.2f}s "
+              f"(includes the client's retries)")
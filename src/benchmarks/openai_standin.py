@@ -0,0 +1,126 @@
+import argparse, json, random, threading, time, uuid
+from collections import deque
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from benchmarks.replay_provider import loadRecordings, promptKey, templateOutput
+
+# A local stand-in for the chat-completions endpoint langextract's OpenAI provider calls,
+# to load-test the extraction path without billing. Answers are the recorded response for
+# the prompt (see benchmarks/replay_provider.py) or a template built from the chunk, after a
+# log-normal latency. A share of the requests can be answered 429 (with retry-after) or 5xx,
+# and --rpm enforces a requests-per-minute limit over a sliding minute, like the provider.
+#
+#   % cd src && python3 -m benchmarks.openai_standin --port 8089 --latency 0.8 --rate-429 0.05 --rate-5xx 0.01
+#   % OPENAI_API_KEY=standin python3 src/main.py meds --records 0-49 --base-url http://127.0.0.1:8089/v1
+
+class ChatCompletionsStandIn(BaseHTTPRequestHandler):
+    latency, sigma = 0.5, 0.3
+    rate429, rate5xx, rpm = 0.0, 0.0, 0
+    fenceOutput = True
+    responses = {}
+    lock = threading.Lock()
+    random = random.Random(0)
+    window = deque()  # times of the accepted requests, with --rpm
+    statuses = {}
+
+    @classmethod
+    def configure(cls, latency=0.5, sigma=0.3, rate429=0.0, rate5xx=0.0, rpm=0, recordings=None, fenceOutput=True, seed=0):
+        cls.latency, cls.sigma = latency, sigma
+        cls.rate429, cls.rate5xx, cls.rpm = rate429, rate5xx, rpm
+        cls.fenceOutput = fenceOutput
+        cls.responses = loadRecordings(recordings)
+        cls.random = random.Random(seed)
+        cls.window = deque()
+        cls.statuses = {}
+
+    def do_POST(self):
+        if not self.path.rstrip('/').endswith('/chat/completions'):
+            return self.reply(404, {'error': {'message': f"unknown path {self.path}", 'type': 'invalid_request_error'}})
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        prompt = next((message['content'] for message in reversed(body.get('messages', []))
+                       if message.get('role') == 'user'), '')
+
+        cls = type(self)
+        with cls.lock:
+            draw = cls.random.random()
+            delay = cls.latency * cls.random.lognormvariate(0, cls.sigma) if cls.latency else 0.0
+            now = time.monotonic()
+            while cls.window and cls.window[0] < now - 60:
+                cls.window.popleft()
+            overLimit = cls.rpm and len(cls.window) >= cls.rpm
+            if not overLimit and draw >= cls.rate429:
+                cls.window.append(now)
+
+        if overLimit or draw < cls.rate429:
+            return self.reply(429, {'error': {'message': 'Rate limit reached for requests', 'type': 'requests',
+                                              'code': 'rate_limit_exceeded'}}, {'retry-after': '1'})
+        if draw < cls.rate429 + cls.rate5xx:
+            time.sleep(delay / 2)
+            status = cls.random.choice([500, 502, 503])
+            return self.reply(status, {'error': {'message': 'The server had an error while processing your request',
+                                                 'type': 'server_error'}})
+
+        output = cls.responses.get(promptKey(prompt)) or templateOutput(prompt, cls.fenceOutput)
+        time.sleep(delay)
+        self.reply(200, {
+            'id': f"chatcmpl-{uuid.uuid4().hex}",
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': body.get('model', 'gpt-4o'),
+            'choices': [{'index': 0, 'finish_reason': 'stop',
+                         'message': {'role': 'assistant', 'content': output, 'refusal': None}}],
+            'usage': {'prompt_tokens': len(prompt) // 4, 'completion_tokens': len(output) // 4,
+                      'total_tokens': (len(prompt) + len(output)) // 4},
+        })
+
+    def reply(self, status, payload, headers=None):
+        data = json.dumps(payload).encode('utf-8')
+        cls = type(self)
+        with cls.lock:
+            cls.statuses[status] = cls.statuses.get(status, 0) + 1
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+def serve(host='127.0.0.1', port=0):
+    # starts the stand-in on a background thread, returns the server and its base URL
+    server = ThreadingHTTPServer((host, port), ChatCompletionsStandIn)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_port}/v1"
+
+def addArguments(parser):
+    parser.add_argument('--latency', type=float, default=0.5, help='median seconds per response')
+    parser.add_argument('--sigma', type=float, default=0.3, help='spread of the log-normal latency (tail)')
+    parser.add_argument('--rate-429', type=float, default=0.0, help='share of requests answered 429')
+    parser.add_argument('--rate-5xx', type=float, default=0.0, help='share of requests answered 500/502/503')
+    parser.add_argument('--rpm', type=int, default=0, help='requests per minute accepted, 0 for no limit')
+    parser.add_argument('--recordings', type=str, help='JSON lines of recorded responses to answer with')
+    parser.add_argument('--no-fences', action='store_true', help='answer raw JSON instead of fenced JSON')
+
+def configureFrom(args):
+    ChatCompletionsStandIn.configure(args.latency, args.sigma, args.rate_429, args.rate_5xx, args.rpm,
+                                     args.recordings, not args.no_fences)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local stand-in for the OpenAI chat-completions API")
+    parser.add_argument('--host', type=str, default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8089)
+    addArguments(parser)
+    args = parser.parse_args()
+
+    configureFrom(args)
+    server, url = serve(args.host, args.port)
+    print(f"chat-completions stand-in listening on {url} (ctrl-c to stop)")
+    try:
+        while True:
+            time.sleep(10)
+            print(f"responses so far: {dict(sorted(ChatCompletionsStandIn.statuses.items()))}")
+    except KeyboardInterrupt:
+        server.shutdown()
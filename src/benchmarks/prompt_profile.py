@@ -0,0 +1,49 @@
+import argparse, contextlib, os
+from extractors import registry
+
+# Prompt size of each extractor: characters and estimated tokens per request, split into
+# prompt description, examples and input chunk, and tokens for a whole note. With --budget,
+# also with the examples trimmed around their extractions. No LLM calls are made.
+#
+#   % cd src && python3 -m benchmarks.prompt_profile --record 0 --budget 150
+
+PARTS = ['description', 'examples', 'input', 'overhead', 'total']
+
+def newExtractor(name):
+    # the extractors check for an API key, the profile doesn't need a real one
+    os.environ.setdefault('OPENAI_API_KEY', 'profile')
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        return registry.newExtractor(name, 'OPENAI')
+
+def printProfile(label, profile):
+    chars, tokens = profile['chars'], profile['tokens']
+    print(f"  {label:<9}" + ''.join(f"{chars[part]:>8}c/{tokens[part]:<6}" for part in PARTS)
+          + f"{profile['requests']:>9}{profile['noteTokens']:>12}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Profile the prompt size of the extractors")
+    parser.add_argument('--extractors', type=str, default=','.join(registry.names()))
+    parser.add_argument('--record', type=int, help='AGBonnet record to use as input (default: a 5000 characters placeholder)')
+    parser.add_argument('--budget', type=int, help='also profile with the examples trimmed to this many characters around each extraction')
+    parser.add_argument('--max-char-buffer', type=int, help="characters per chunk (default: the extractor's)")
+    args = parser.parse_args()
+
+    if args.record is not None:
+        from dataset import AGBonnetDataset
+        inputText = AGBonnetDataset().getNote(args.record)
+    else:
+        inputText = 'x' * 5000
+
+    print(f"input: {len(inputText)} characters, values are characters/estimated tokens per request")
+    print(f"  {'':<9}" + ''.join(f"{part:>16}" for part in PARTS) + f"{'requests':>9}{'note tokens':>12}")
+    for name in args.extractors.split(','):
+        extractor = newExtractor(name)
+        extractor.setChunking(maxCharBuffer=args.max_char_buffer)
+        print(name)
+        whole = extractor.profilePrompt(inputText)
+        printProfile('whole', whole)
+        if args.budget is not None:
+            extractor.setPromptBudget(args.budget)
+            trimmed = extractor.profilePrompt(inputText)
+            printProfile('trimmed', trimmed)
+            print(f"  {100 * (1 - trimmed['noteTokens'] / whole['noteTokens']):.0f}% fewer input tokens per note")
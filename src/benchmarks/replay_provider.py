@@ -0,0 +1,103 @@
+import hashlib, json, os, random, re, threading, time
+import langextract as lx
+from langextract.core import base_model, data, format_handler, types
+from benchmarks.synthetic import MEDICATIONS, CONDITIONS, SYMPTOMS
+
+# A langextract model that answers from recorded responses, so the pipeline can be run and
+# benchmarked without network or API keys. Responses are keyed by the sha256 of the prompt
+# (so a replay needs the same extractor, chunking and examples as the recording) and kept
+# in a JSON lines file. In record mode every prompt goes to the real model and its answer
+# is appended to the file.
+#
+# Prompts without a recording either fail (missing='error') or are answered from a template
+# (missing='template'): the known medications, conditions and symptoms found in the chunk.
+
+VOCABULARY = [('medication', MEDICATIONS), ('condition', CONDITIONS), ('symptom', SYMPTOMS)]
+
+def promptKey(prompt):
+    return hashlib.sha256(prompt.encode('utf-8')).hexdigest()
+
+def promptQuestion(prompt):
+    # the chunk of the note: the text of the last question of the prompt
+    start = prompt.rfind('Q: ')
+    end = prompt.rfind('\nA: ')
+    return prompt[start + 3:end if end > start else None] if start >= 0 else prompt
+
+def templateOutput(prompt, fenceOutput=True):
+    # an answer in langextract's format with the vocabulary found in the chunk, in text order
+    question = promptQuestion(prompt)
+    found = []
+    for extraction_class, words in VOCABULARY:
+        for word in words:
+            for match in re.finditer(re.escape(word), question, re.IGNORECASE):
+                found.append((match.start(), extraction_class, match.group(0)))
+    found.sort()
+    extractions = [data.Extraction(extraction_class=extraction_class, extraction_text=text, attributes={})
+                   for _, extraction_class, text in found]
+    handler = format_handler.FormatHandler(format_type=data.FormatType.JSON, use_wrapper=True,
+                                           wrapper_key=data.EXTRACTIONS_KEY, use_fences=fenceOutput)
+    return handler.format_extraction_example(extractions)
+
+class ReplayModel(base_model.BaseLanguageModel):
+
+    def __init__(self, recordingsPath, latency=0.0, jitter=0.0, record=None, missing='error', fenceOutput=True):
+        # latency and jitter in seconds: each answer waits latency +/- jitter, the same for the same prompt
+        super().__init__()
+        self.recordingsPath = recordingsPath
+        self.latency = latency
+        self.jitter = jitter
+        self.record = record
+        self.missing = missing
+        self.fenceOutput = fenceOutput
+        self.responses = loadRecordings(recordingsPath)
+        self.lock = threading.Lock()
+        self.replayed = 0
+        self.templated = 0
+        self.recorded = 0
+
+    def respond(self, prompt, kwargs):
+        key = promptKey(prompt)
+        if self.record is not None:
+            output = next(iter(self.record.infer(batch_prompts=[prompt], **kwargs)))[0].output
+            with self.lock:
+                self.responses[key] = output
+                self.recorded += 1
+                appendRecording(self.recordingsPath, key, output)
+            return output
+
+        output = self.responses.get(key)
+        if output is None:
+            if self.missing != 'template':
+                raise lx.exceptions.InferenceRuntimeError(f"no recorded response for prompt {key[:12]}", provider='replay')
+            output = templateOutput(prompt, self.fenceOutput)
+            with self.lock:
+                self.templated += 1
+        else:
+            with self.lock:
+                self.replayed += 1
+
+        delay = self.latency
+        if self.jitter:
+            delay += random.Random(key).uniform(-self.jitter, self.jitter)
+        if delay > 0:
+            time.sleep(delay)
+        return output
+
+    def infer(self, batch_prompts, **kwargs):
+        for prompt in batch_prompts:
+            yield [types.ScoredOutput(score=1.0, output=self.respond(prompt, kwargs))]
+
+def loadRecordings(path):
+    responses = {}
+    if path and os.path.isfile(path):
+        with open(path, 'r') as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    responses[entry['prompt_sha256']] = entry['output']
+    return responses
+
+def appendRecording(path, key, output):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'a') as f:
+        f.write(json.dumps({'prompt_sha256': key, 'output': output}) + '\n')
@@ -0,0 +1,65 @@
+import json, random
+
+# Synthetic annotated documents, shaped like the JSONL written by LangExtractor.saveResults
+
+MEDICATIONS = ["olanzapine", "lithium", "sodium valproate", "escitalopram", "tetrabenazine",
+               "trihexyphenidyl", "eltroxin", "ibuprofen", "cefazolin", "metformin"]
+CONDITIONS = ["bipolar affective disorder", "tardive dystonia", "hypothyroidism", "amenorrhea",
+              "sclerosing xanthofibroma", "hypertension", "diabetes mellitus", "asthma"]
+SYMPTOMS = ["neck pain", "restriction of body movements", "swelling on the right back",
+            "sustained contraction of the neck muscles", "fever", "fatigue"]
+ALIGNMENTS = ["match_exact", "match_exact", "match_fuzzy", "match_lesser"]
+
+def syntheticExtraction(rnd, index, position):
+    kind = rnd.random()
+    if kind < 0.35:
+        extraction_class, text, attributes = "medication", rnd.choice(MEDICATIONS), {"dosis": f"{rnd.randint(1, 50) * 10} mg"}
+    elif kind < 0.6:
+        extraction_class, text, attributes = "condition", rnd.choice(CONDITIONS), {"cause": "unspecified"}
+    elif kind < 0.85:
+        extraction_class, text, attributes = "symptom", rnd.choice(SYMPTOMS), {"duration": "past four months"}
+    else:
+        extraction_class, text = "relationship", f"{rnd.choice(MEDICATIONS)} for {rnd.choice(CONDITIONS)}"
+        entity_1, entity_2 = text.split(" for ")
+        attributes = {"entity_1": entity_1, "entity_2": entity_2}
+    return {
+        "extraction_class": extraction_class,
+        "extraction_text": text,
+        "char_interval": {"start_pos": position, "end_pos": position + len(text)},
+        "alignment_status": rnd.choice(ALIGNMENTS),
+        "extraction_index": index,
+        "group_index": index,
+        "description": None,
+        "attributes": attributes,
+    }
+
+def syntheticDocument(i, extractions=20, seed=0):
+    rnd = random.Random(seed * 1000003 + i)
+    items, texts, position = [], [], 0
+    for index in range(extractions):
+        extraction = syntheticExtraction(rnd, index + 1, position)
+        texts.append(extraction["extraction_text"])
+        position += len(extraction["extraction_text"]) + 1
+        items.append(extraction)
+    return {"document_id": f"doc_{seed}_{i}", "text": " ".join(texts), "extractions": items}
+
+def writeSyntheticJsonl(path, documents, extractions=20, seed=0):
+    with open(path, 'w') as f:
+        for i in range(documents):
+            f.write(json.dumps(syntheticDocument(i, extractions, seed)) + '\n')
+    return path
+
+def syntheticNote(i, characters=4000, seed=0):
+    # free text shaped like a clinical note, for runs without the AGBonnet dataset
+    rnd = random.Random(seed * 1000003 + i)
+    sentences, length = [], 0
+    while length < characters:
+        sentence = rnd.choice([
+            f"The patient was started on {rnd.choice(MEDICATIONS)} {rnd.randint(1, 50) * 10} mg per day for {rnd.choice(CONDITIONS)}.",
+            f"She presented with {rnd.choice(SYMPTOMS)} and {rnd.choice(SYMPTOMS)} for the past {rnd.randint(2, 12)} weeks.",
+            f"A history of {rnd.choice(CONDITIONS)} was noted, treated with {rnd.choice(MEDICATIONS)}.",
+            f"On examination there was no {rnd.choice(SYMPTOMS)}, and {rnd.choice(MEDICATIONS)} was stopped.",
+        ])
+        sentences.append(sentence)
+        length += len(sentence) + 1
+    return " ".join(sentences)
@@ -0,0 +1,61 @@
+import json, os, re, threading, unicodedata
+from functools import lru_cache
+
+# doses and strengths: "10 mg", "2.5mg", "450 mg per day", "50 micrograms", "1000 mg/day"
+# (matched after normalize(), where casefold turns the micro sign of "µg" into Greek mu)
+DOSE = re.compile(r"\b\d+(?:[.,]\d+)?\s*(?:mg|mcg|μg|ug|g|ml|iu|units?|micrograms?|milligrams?|grams?)\b"
+                  r"(?:\s*(?:/|per)\s*(?:day|dose|kg|h|hr|hour))?")
+# pharmaceutical forms, anywhere in the text
+FORMS = re.compile(r"\b(?:tab|tabs|tablets?|caps?|capsules?|inj|injections?|syrup|suspension|solution|"
+                   r"drops|cream|ointment|patch|inhaler)\b\.?")
+# routes, only in front of the name ("IV cefazolin"), elsewhere they can be part of it ("stage iv")
+ROUTES = re.compile(r"^(?:(?:po|iv|im|sc|sl|oral|intravenous|intramuscular)\b\.?\s*)+")
+# release suffixes, only as the last token after the name ("metformin er")
+RELEASE = re.compile(r"(?<=\w)\s+(?:sr|xr|er|cr)$")
+PUNCTUATION = re.compile(r"[^\w\s\-]")
+
+DEFAULT_SYNONYMS = os.path.join(os.path.dirname(__file__), 'canonical_synonyms.json')
+
+class Canonicalizer():
+    # Maps the many ways a medication or condition is written to one canonical name:
+    # Unicode normalization, lower case, no accents and, for medications only, dose, form,
+    # route and release tokens removed (in a condition they are part of the name: "oral
+    # cancer", "ER visit"), then aliases resolved through a synonym dictionary
+    # ({"canonical": ["alias", ...]}).
+    # Results are memoized, the same few thousand names come back all the time.
+
+    def __init__(self, synonymsPath=DEFAULT_SYNONYMS, memoSize=65536):
+        self.aliases = {}
+        if synonymsPath and os.path.isfile(synonymsPath):
+            with open(synonymsPath, 'r') as f:
+                for canonical, aliases in json.load(f).items():
+                    target = self.normalize(canonical)
+                    for alias in aliases:
+                        self.aliases[self.normalize(alias)] = target
+        self.canonical = lru_cache(maxsize=memoSize)(self.canonicalize)
+
+    def normalize(self, text, extractionClass=None):
+        text = unicodedata.normalize('NFKD', text.casefold())
+        text = ''.join(char for char in text if not unicodedata.combining(char))
+        plain = ' '.join(PUNCTUATION.sub(' ', text).split())
+        if extractionClass != 'medication':
+            return plain
+        stripped = ROUTES.sub('', FORMS.sub(' ', DOSE.sub(' ', text)).strip())
+        stripped = RELEASE.sub('', ' '.join(PUNCTUATION.sub(' ', stripped).split()))
+        # nothing but dose and form (ie. "10 mg"): keep what was written
+        return stripped or plain
+
+    def canonicalize(self, text, extractionClass=None):
+        normalized = self.normalize(text, extractionClass)
+        return self.aliases.get(normalized, normalized)
+
+_shared = None
+_sharedLock = threading.Lock()
+
+def getCanonicalizer():
+    # CANONICAL_SYNONYMS points to another synonym dictionary
+    global _shared
+    with _sharedLock:
+        if _shared is None:
+            _shared = Canonicalizer(os.getenv('CANONICAL_SYNONYMS', DEFAULT_SYNONYMS))
+        return _shared
@@ -0,0 +1,84 @@
+import os, json
+from array import array
+
+HF_DATASET = "hf://datasets/AGBonnet/augmented-clinical-notes/augmented_notes_30K.jsonl"
+
+class AGBonnetDataset():
+    # Local cache of AGBonnet as one JSON record per line, plus a byte-offset index
+    # (data/agbonnet.jsonl.idx) so a record is read with one seek and one line parse.
+
+    def __init__(self, dataDir='data'):
+        self.path = os.path.join(dataDir, 'agbonnet.jsonl')
+        self.indexPath = self.path + '.idx'
+        legacyPath = os.path.join(dataDir, 'agbonnet.json')
+
+        if not self.readable(self.path):
+            os.makedirs(dataDir, exist_ok=True)
+            if self.readable(legacyPath):
+                # cache from an older version (a single indented JSON array)
+                self.migrate(legacyPath)
+            else:
+                self.download()
+
+        if not self.readable(self.indexPath) or os.path.getmtime(self.indexPath) < os.path.getmtime(self.path):
+            self.buildIndex()
+
+        # n+1 offsets: record i is the byte range [offsets[i], offsets[i+1])
+        self.offsets = array('Q')
+        with open(self.indexPath, 'rb') as f:
+            self.offsets.fromfile(f, os.path.getsize(self.indexPath) // self.offsets.itemsize)
+        self.fd = os.open(self.path, os.O_RDONLY)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def get(self, i):
+        if i < 0:
+            i += len(self)
+        if i < 0 or i >= len(self):
+            raise IndexError(f"record {i} out of range (dataset has {len(self)} records)")
+        start, end = self.offsets[i], self.offsets[i + 1]
+        # pread does not move a shared file position, so batch workers can read concurrently
+        return json.loads(os.pread(self.fd, end - start, start))
+
+    def getNote(self, i):
+        return self.get(i)['full_note']
+
+    def close(self):
+        os.close(self.fd)
+
+    def download(self):
+        import pandas as pd
+        print(f"downloading data from HuggingFace... wait...\n")
+        df = pd.read_json(HF_DATASET, lines=True)
+        df.to_json(self.path + '.tmp', orient='records', lines=True, force_ascii=False)
+        os.replace(self.path + '.tmp', self.path)
+        print(f"data downloaded. Continuing...\n")
+
+    def migrate(self, legacyPath):
+        print(f"migrating {legacyPath} to {self.path} (only once)...")
+        with open(legacyPath, 'r') as f:
+            rows = json.load(f)
+        with open(self.path + '.tmp', 'w') as f:
+            for row in rows:
+                f.write(json.dumps(row, ensure_ascii=False) + '\n')
+        os.replace(self.path + '.tmp', self.path)
+        print(f"{len(rows)} records migrated. Continuing...\n")
+
+    def buildIndex(self):
+        print(f"indexing {self.path}...")
+        offsets = array('Q')
+        position = 0
+        with open(self.path, 'rb') as f:
+            for line in f:
+                if line.strip():  # Skip empty lines
+                    offsets.append(position)
+                    end = position + len(line)
+                position += len(line)
+        offsets.append(end if offsets else 0)
+        with open(self.indexPath + '.tmp', 'wb') as f:
+            offsets.tofile(f)
+        os.replace(self.indexPath + '.tmp', self.indexPath)
+
+    def readable(self, path):
+        return os.path.isfile(path) and os.access(path, os.R_OK)
@@ -0,0 +1,70 @@
+import time, threading
+from concurrent.futures import ThreadPoolExecutor
+
+class ChunkTimer():
+    # Times every request langextract sends to the model, one per chunk and extraction pass.
+    # wrap() replaces the model's infer with one that sends each prompt of a batch on its own
+    # (up to maxWorkers at a time, like the providers do), so each one can be timed and, with
+    # a RateLimiter, go through it (the time waiting for the limiter is not counted).
+
+    def __init__(self, maxWorkers=10):
+        self.maxWorkers = maxWorkers
+        self.latencies = []
+        self.lock = threading.Lock()
+        self.started = None
+        self.finished = None
+
+    def wrap(self, model, limiter=None):
+        infer = model.infer
+
+        def request(prompt, kwargs):
+            started = time.perf_counter()
+            try:
+                return list(next(iter(infer(batch_prompts=[prompt], **kwargs))))
+            finally:
+                with self.lock:
+                    self.latencies.append(time.perf_counter() - started)
+
+        def timed(prompt, kwargs):
+            if limiter is None:
+                return request(prompt, kwargs)
+            # ~4 characters per token, the answer is small next to the prompt
+            return limiter.call(lambda: request(prompt, kwargs), 1, len(prompt) // 4)
+
+        def timedInfer(batch_prompts, **kwargs):
+            if self.started is None:
+                self.started = time.perf_counter()
+            workers = min(self.maxWorkers, len(batch_prompts))
+            if workers <= 1:
+                outputs = [timed(prompt, dict(kwargs)) for prompt in batch_prompts]
+            else:
+                with ThreadPoolExecutor(max_workers=workers) as pool:
+                    outputs = list(pool.map(lambda prompt: timed(prompt, dict(kwargs)), batch_prompts))
+            self.finished = time.perf_counter()
+            yield from outputs
+
+        model.infer = timedInfer
+        return model
+
+    def requests(self):
+        # chunks times extraction passes
+        return len(self.latencies)
+
+    def percentile(self, fraction):
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] if ordered else 0.0
+
+    def stats(self):
+        return {
+            'requests': self.requests(),
+            'p50': self.percentile(0.5),
+            'p95': self.percentile(0.95),
+            'max': max(self.latencies, default=0.0),
+            'mean': sum(self.latencies) / len(self.latencies) if self.latencies else 0.0,
+            'wall': (self.finished - self.started) if self.started is not None and self.finished else 0.0,
+        }
+
+    def summary(self):
+        stats = self.stats()
+        return (f"{stats['requests']} requests in {stats['wall']:.1f}s, per request latency "
+                f"p50 {stats['p50']:.2f}s, p95 {stats['p95']:.2f}s, max {stats['max']:.2f}s")
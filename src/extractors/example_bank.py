@@ -0,0 +1,155 @@
+import json, os, re, zlib
+import numpy as np
+import langextract as lx
+from extractors.prompt_budget import extractionSpans
+
+TOKEN = re.compile(r"[a-z0-9]+")
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+def exampleToDict(example):
+    return {
+        'text': example.text,
+        'extractions': [{
+            'extraction_class': extraction.extraction_class,
+            'extraction_text': extraction.extraction_text,
+            'attributes': extraction.attributes or {},
+        } for extraction in example.extractions],
+    }
+
+def exampleFromDict(entry):
+    return lx.data.ExampleData(
+        text=entry['text'],
+        extractions=[lx.data.Extraction(extraction_class=extraction['extraction_class'],
+                                        extraction_text=extraction['extraction_text'],
+                                        attributes=extraction.get('attributes') or None)
+                     for extraction in entry['extractions']])
+
+def splitExample(example, windowChars=1200):
+    # The example cut into windows of whole sentences of about windowChars characters, each one
+    # with the extractions found in it, so one long example gives many short ones to pick from.
+    # Extractions the text doesn't contain (ie. normalized demographics) stay with the first
+    # window, windows without extractions are dropped.
+    text = example.text
+    spans = extractionSpans(text, example.extractions)
+    # never cut through an extraction
+    cuts = [match.end() for match in SENTENCE_END.finditer(text)
+            if not any(span and span[0] < match.end() < span[1] for span in spans)]
+
+    windows, start = [], 0
+    for cut in cuts + [len(text)]:
+        if cut - start >= windowChars or cut == len(text):
+            windows.append((start, cut))
+            start = cut
+    if len(windows) > 1 and windows[-1][1] - windows[-1][0] < windowChars // 4:
+        # a short tail goes with the window before
+        windows[-2:] = [(windows[-2][0], windows[-1][1])]
+
+    examples = []
+    for i, (start, end) in enumerate(windows):
+        extractions = [extraction for extraction, span in zip(example.extractions, spans)
+                       if (span and start <= span[0] < end) or (span is None and i == 0)]
+        if extractions:
+            examples.append(lx.data.ExampleData(text=' '.join(text[start:end].split()), extractions=extractions))
+    return examples
+
+class ExampleBank():
+    # Few-shot examples from which the k most similar to the input text are picked. Texts are
+    # turned into hashed TF-IDF vectors (unigrams and bigrams), L2 normalized, so one matrix
+    # product gives every cosine similarity. Pass it to LangExtractor.setExamples in place of a list.
+    #
+    # fromExtractor builds it from the extractor's own examples, cut into windows (splitExample),
+    # fromDirectory from a directory of curated examples (one JSON file each: text and
+    # extractions), whose matrix is saved next to them and rebuilt when they change.
+
+    INDEX = 'index.npz'
+
+    def __init__(self, examples, k=2, dimensions=1 << 14):
+        self.k = k
+        self.dimensions = dimensions
+        self.examples = list(examples)
+        self.buildIndex()
+
+    @classmethod
+    def fromExtractor(cls, extractor, k=2, windowChars=1200, bankDir=None):
+        # the windows of the extractor's examples, plus the examples of bankDir if given
+        examples = [window for example in extractor.examples for window in splitExample(example, windowChars)]
+        if bankDir:
+            examples += cls.fromDirectory(bankDir, k).examples
+        return cls(examples, k)
+
+    @classmethod
+    def fromDirectory(cls, bankDir, k=2, dimensions=1 << 14):
+        bank = cls.__new__(cls)
+        bank.k, bank.dimensions = k, dimensions
+        files = sorted(name for name in os.listdir(bankDir) if name.endswith('.json'))
+        bank.examples = []
+        for name in files:
+            with open(os.path.join(bankDir, name), 'r') as f:
+                bank.examples.append(exampleFromDict(json.load(f)))
+
+        # what the index was built from
+        stats = [os.stat(os.path.join(bankDir, name)) for name in files]
+        signature = np.array([dimensions] + [int(stat.st_mtime_ns) ^ stat.st_size for stat in stats], dtype=np.int64)
+        path = os.path.join(bankDir, cls.INDEX)
+        if os.path.isfile(path):
+            with np.load(path) as index:
+                if np.array_equal(index['signature'], signature):
+                    bank.idf, bank.matrix = index['idf'], index['matrix']
+                    return bank
+        bank.buildIndex()
+        tmp = path + '.tmp.npz'
+        np.savez_compressed(tmp, signature=signature, idf=bank.idf, matrix=bank.matrix)
+        os.replace(tmp, path)
+        return bank
+
+    def __len__(self):
+        return len(self.examples)
+
+    def termCounts(self, text):
+        # {hashed term: count}, with unigrams and bigrams
+        words = TOKEN.findall(text.lower())
+        terms = words + [a + ' ' + b for a, b in zip(words, words[1:])]
+        counts = {}
+        for term in terms:
+            bucket = zlib.crc32(term.encode('utf-8')) % self.dimensions
+            counts[bucket] = counts.get(bucket, 0) + 1
+        return counts
+
+    def termFrequencies(self, text):
+        counts = self.termCounts(text)
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        if counts:
+            buckets = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+            vector[buckets] = 1 + np.log(np.fromiter(counts.values(), dtype=np.float32, count=len(counts)))
+        return vector
+
+    def buildIndex(self):
+        tf = np.stack([self.termFrequencies(example.text) for example in self.examples]) if self.examples \
+            else np.zeros((0, self.dimensions), dtype=np.float32)
+        documentFrequency = np.count_nonzero(tf, axis=0)
+        self.idf = (np.log((1 + len(self.examples)) / (1 + documentFrequency)) + 1).astype(np.float32)
+        self.matrix = self.normalize(tf * self.idf)
+
+    @staticmethod
+    def normalize(vectors):
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        return vectors / np.where(norms == 0, 1, norms)
+
+    def similarities(self, text):
+        return self.matrix @ self.normalize(self.termFrequencies(text) * self.idf)
+
+    def select(self, text, k=None):
+        # the k examples closest to the text, most similar first
+        k = min(k or self.k, len(self.examples))
+        if k == 0:
+            return []
+        scores = self.similarities(text)
+        top = np.argpartition(-scores, k - 1)[:k]
+        return [self.examples[i] for i in top[np.argsort(-scores[top])]]
+
+def exportExamples(examples, bankDir, prefix='example'):
+    # writes a list of lx.data.ExampleData as a bank
+    os.makedirs(bankDir, exist_ok=True)
+    for i, example in enumerate(examples):
+        with open(os.path.join(bankDir, f"{prefix}_{i}.json"), 'w') as f:
+            json.dump(exampleToDict(example), f, indent=2, ensure_ascii=False)
@@ -0,0 +1,117 @@
+import os, json, hashlib, dataclasses, threading
+import langextract as lx
+
+class ExtractionCache():
+    # On-disk cache of lx.extract results, one JSON file per
+    # hash(model_id, prompt, examples, input text, extraction parameters).
+    # When the directory grows over maxBytes the least recently used entries are evicted, down
+    # to 90% of it so the next writes don't evict again. The size is kept as a running total,
+    # and the directory is only listed to evict, or every RESCAN writes to catch up with other
+    # processes sharing it.
+
+    RESCAN = 1000
+
+    def __init__(self, cacheDir='cache/extractions', maxBytes=512 * 1024 * 1024):
+        self.cacheDir = cacheDir
+        self.maxBytes = maxBytes
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        os.makedirs(self.cacheDir, exist_ok=True)
+        self.size = self.count = 0
+        self.puts = 0
+        self.scan()
+
+    def key(self, prompt, examples, inputText, params):
+        payload = json.dumps({
+            'prompt': prompt,
+            'examples': [dataclasses.asdict(example) for example in examples],
+            'input_text': inputText,
+            # the api key does not change the result, and should not end up in the cache
+            'params': {name: value for name, value in params.items() if name != 'api_key'},
+        }, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        path = self.pathFor(key)
+        try:
+            with open(path, 'r') as f:
+                adoc = json.load(f)
+            # touch it, eviction goes by last use
+            os.utime(path)
+        except (FileNotFoundError, json.JSONDecodeError):
+            with self.lock:
+                self.misses += 1
+            return None
+        with self.lock:
+            self.hits += 1
+        return lx.data_lib.dict_to_annotated_document(adoc)
+
+    def put(self, key, result):
+        path = self.pathFor(key)
+        with open(path + '.tmp', 'w') as f:
+            json.dump(lx.data_lib.annotated_document_to_dict(result), f, ensure_ascii=False)
+            size = f.tell()
+        try:
+            replaced = os.path.getsize(path)
+        except FileNotFoundError:
+            replaced = None
+        os.replace(path + '.tmp', path)
+        with self.lock:
+            self.size += size - (replaced or 0)
+            self.count += replaced is None
+            self.puts += 1
+            due = self.size > self.maxBytes or self.puts % self.RESCAN == 0
+        if due:
+            self.evict()
+
+    def scan(self):
+        # the entries of the directory, least recently used first, and their total size
+        entries = []
+        for entry in os.scandir(self.cacheDir):
+            if entry.name.endswith('.json'):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        entries.sort()
+        with self.lock:
+            self.size = sum(size for _, size, _ in entries)
+            self.count = len(entries)
+        return entries
+
+    def evict(self):
+        entries = self.scan()
+        with self.lock:
+            if self.size <= self.maxBytes:
+                return
+            target = self.maxBytes * 0.9
+            for _, size, path in entries:
+                if self.size <= target:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                self.size -= size
+                self.count -= 1
+
+    def pathFor(self, key):
+        return os.path.join(self.cacheDir, f"{key}.json")
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'entries': self.count, 'bytes': self.size}
+
+_sharedCache = None
+_sharedLock = threading.Lock()
+
+def getSharedCache():
+    # a single cache (and set of counters) per process, configured from the environment
+    global _sharedCache
+    with _sharedLock:
+        if _sharedCache is None:
+            _sharedCache = ExtractionCache(
+                cacheDir=os.getenv('EXTRACTION_CACHE_DIR', 'cache/extractions'),
+                maxBytes=int(os.getenv('EXTRACTION_CACHE_MAX_MB', '512')) * 1024 * 1024)
+        return _sharedCache
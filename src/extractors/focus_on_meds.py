@@ -6,6 +6,8 @@ class ExtractorFocusOnMeds(LangExtractor):
 
     def __init__(self, model):
         super().__init__(model)
+        # medication, dose and frequency tend to share a sentence or two
+        self.setChunking(maxCharBuffer=1500, batchLength=10, maxWorkers=10, extractionPasses=1)
         self.prompt = textwrap.dedent("""\
                         Extract patient demographics (age, sex),
                         patient symptoms, patient conditions and causes, 
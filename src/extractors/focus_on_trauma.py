@@ -6,6 +6,8 @@ class ExtractorFocusOnTrauma(LangExtractor):
 
     def __init__(self, model):
         super().__init__(model)
+        # trauma notes list many procedures, smaller chunks keep each answer short
+        self.setChunking(maxCharBuffer=1000, batchLength=10, maxWorkers=10, extractionPasses=1)
         self.prompt = textwrap.dedent("""\
                         Extract patient demographics (age, sex),
                         conditions, causes and treatment,
@@ -6,6 +6,8 @@ class GeneralExtractor(LangExtractor):
 
     def __init__(self, model):
         super().__init__(model)
+        # broad extraction over long notes: bigger chunks, fewer requests
+        self.setChunking(maxCharBuffer=2000, batchLength=10, maxWorkers=10, extractionPasses=1)
         self.prompt = textwrap.dedent("""\
                         Extract patient, diagnosis and treatment information including:
                         patient age, sex, 
@@ -1,13 +1,36 @@
 from dotenv import load_dotenv
 import langextract as lx
 import os
+import math
+import asyncio
 import textwrap
+from extractors.extraction_cache import getSharedCache
+from extractors.rate_limiter import getLimiter
+from extractors.chunk_timing import ChunkTimer
+from extractors.prompt_budget import trimExample, profilePrompt
 
 load_dotenv()
 
 class LangExtractor():
 
+    # how langextract splits and parallelizes long notes, subclasses tune them with setChunking
+    # max_char_buffer: characters per chunk, batch_length: chunks per batch,
+    # max_workers: requests in flight per extraction, extraction_passes: times the note is read
+    DEFAULT_CHUNKING = {'max_char_buffer': 1000, 'batch_length': 10, 'max_workers': 10, 'extraction_passes': 1}
+
     def __init__(self, model):
+        self.chunking = dict(self.DEFAULT_CHUNKING)
+        self.lastChunkStats = None
+        # characters kept around each extraction of the examples, None sends them whole
+        self.exampleContext = None
+        self.trimmed = {}
+        # builds the langextract model from (params, examples), None for the provider of the model_id
+        self.modelFactory = None
+        # another endpoint speaking the provider's API (ie. a local stand-in), None for the provider's
+        self.baseUrl = None
+        # every request goes through the model's rate limiter (see rate_limiter.py)
+        self.rateLimited = True
+        self.maxInFlight = None
         match model:
             case 'GEMINI':
                 print('creating a GEMINI instance')
@@ -30,6 +53,9 @@ class LangExtractor():
                 print('model must be one of `GEMINI` or `OPENAI`')
                 return False
 
+        # identical requests are answered from the on-disk cache (EXTRACTION_CACHE=off to disable)
+        self.bypassCache = os.getenv('EXTRACTION_CACHE', 'on').lower() == 'off'
+
     def setPrompt(self, prompt):
         self.prompt = textwrap.dedent(prompt)
     
@@ -37,37 +63,167 @@ class LangExtractor():
         self.input_text = inputText
 
     def setExamples(self, examples):
+        # a list of lx.data.ExampleData, or an ExampleBank to pick the closest ones to each input
         self.examples = examples
+
+    def setBypassCache(self, bypass):
+        self.bypassCache = bypass
+
+    def setRateLimit(self, enabled=True, maxInFlight=None):
+        # maxInFlight: requests to the model running at once in this process, for every extractor
+        # on that model (default MAX_IN_FLIGHT). Replayed models (benchmarks) don't need the limiter
+        self.rateLimited = enabled
+        self.maxInFlight = maxInFlight
+
+    def setChunking(self, maxCharBuffer=None, batchLength=None, maxWorkers=None, extractionPasses=None):
+        # only the given values change
+        overrides = {'max_char_buffer': maxCharBuffer, 'batch_length': batchLength,
+                     'max_workers': maxWorkers, 'extraction_passes': extractionPasses}
+        self.chunking.update({name: value for name, value in overrides.items() if value is not None})
+
+    def setBaseUrl(self, baseUrl):
+        # ie. http://127.0.0.1:8089/v1 (see benchmarks/openai_standin.py). Only for OPENAI
+        self.baseUrl = baseUrl
+
+    def setModelFactory(self, factory):
+        # ie. a replay model for offline runs (see benchmarks/replay_provider.py)
+        self.modelFactory = factory
+
+    def setPromptBudget(self, exampleContext):
+        # Budget mode: the examples are sent trimmed to `exampleContext` characters around
+        # their extractions (None to send them whole). Their extractions stay aligned.
+        self.exampleContext = exampleContext
+
+    def promptExamples(self, inputText):
+        # the examples as they are sent to the model for this input
+        examples = self.examples.select(inputText) if hasattr(self.examples, 'select') else self.examples
+        if self.exampleContext is None:
+            return examples
+        selected = []
+        for example in examples:
+            key = (id(example), self.exampleContext)
+            if key not in self.trimmed or self.trimmed[key][0] is not example:
+                self.trimmed[key] = (example, trimExample(example, self.exampleContext))
+            selected.append(self.trimmed[key][1])
+        return selected
+
+    def profilePrompt(self, inputText=None):
+        # characters and estimated tokens per request (description, examples, input) and per note
+        text = getattr(self, 'input_text', '') if inputText is None else inputText
+        params = self.extractionParams() or {}
+        return profilePrompt(self.prompt, self.promptExamples(text or ''), text or '',
+                             self.chunking['max_char_buffer'], self.chunking['extraction_passes'],
+                             bool(params.get('fence_output')))
+
+    def extractionParams(self):
+        if self.model == 'GEMINI':
+            return {
+                'model_id': "gemini-2.5-pro",
+                **self.chunking
+            }
+        elif self.model == 'OPENAI':
+            return {
+                'model_id': "gpt-4o",  # Automatically selects OpenAI provider
+                'api_key': os.environ.get('OPENAI_API_KEY'),
+                'fence_output': True,
+                'use_schema_constraints': False,
+                # part of the params so results from another endpoint are cached apart
+                **({'model_url': self.baseUrl} if self.baseUrl else {}),
+                **self.chunking
+            }
+        return None
     
     def extract(self):
         if not self.prompt or not self.input_text or not self.examples:
             print(f"We need prompt, input text and examples to do an extraction")
             return False
         
-        print(f"extractor will commence lang extract...")
-        if self.model == 'GEMINI':
-            self.result = lx.extract(
-                text_or_documents=self.input_text,
-                prompt_description=self.prompt,
-                examples= self.examples,
-                model_id="gemini-2.5-pro"
-            )
-        elif self.model == 'OPENAI':
-            self.result = lx.extract(
-                text_or_documents=self.input_text,
-                prompt_description=self.prompt,
-                examples=self.examples,
-                model_id="gpt-4o",  # Automatically selects OpenAI provider
-                api_key=os.environ.get('OPENAI_API_KEY'),
-                fence_output=True,
-                use_schema_constraints=False
-            )
-        else:
+        params = self.extractionParams()
+        if params is None:
             print(f"Some error has occurred. the model -- {self.model} -- is invalid")
             return False
-        print(f"extraction completed...")
+
+        cache, cacheKey, self.result = self.lookupCache(self.input_text, params)
+        if self.result:
+            print(f"extraction found in cache...")
+            return self.result
+
+        print(f"extractor will commence lang extract...")
+        self.result = self.callLangExtract(self.input_text, params)
+        if cache:
+            cache.put(cacheKey, self.result)
+        print(f"extraction completed ({self.lastChunkStats['requests']} requests)...")
         return self.result
 
+    async def extractAsync(self, inputText=None, maxInFlight=None):
+        # Same as extract(), without blocking the event loop, so many extractions can run
+        # concurrently (ie. with asyncio.gather). Their requests share the model's rate limiter.
+        # With an explicit inputText the extractor state is left untouched.
+        text = self.input_text if inputText is None else inputText
+        if not self.prompt or not text or not self.examples:
+            print(f"We need prompt, input text and examples to do an extraction")
+            return False
+
+        params = self.extractionParams()
+        if params is None:
+            print(f"Some error has occurred. the model -- {self.model} -- is invalid")
+            return False
+
+        cache, cacheKey, result = self.lookupCache(text, params)
+        if not result:
+            result = await asyncio.to_thread(self.callLangExtract, text, params, maxInFlight)
+            if cache:
+                cache.put(cacheKey, result)
+
+        if inputText is None:
+            self.result = result
+        return result
+
+    def lookupCache(self, inputText, params):
+        if self.bypassCache:
+            return None, None, None
+        cache = getSharedCache()
+        cacheKey = cache.key(self.prompt, self.promptExamples(inputText), inputText, params)
+        return cache, cacheKey, cache.get(cacheKey)
+
+    def languageModel(self, params, examples):
+        # the model lx.extract would create from these params, built here so its requests can be timed
+        useSchema = params.get('use_schema_constraints', True)
+        providerArgs = {'api_key': params.get('api_key'), 'base_url': params.get('model_url'),
+                        'max_workers': params.get('max_workers')}
+        config = lx.factory.ModelConfig(model_id=params['model_id'],
+                                        provider_kwargs={name: value for name, value in providerArgs.items() if value is not None})
+        return lx.factory.create_model(config=config,
+                                       examples=examples if useSchema else None,
+                                       use_schema_constraints=useSchema,
+                                       fence_output=params.get('fence_output'))
+
+    def callLangExtract(self, inputText, params, maxInFlight=None):
+        examples = self.promptExamples(inputText)
+        timer = ChunkTimer(params.get('max_workers', 10))
+        # each request waits for a slot and budget of the limiter the whole process shares
+        limiter = getLimiter(params['model_id'], maxInFlight or self.maxInFlight) if self.rateLimited else None
+        model = timer.wrap((self.modelFactory or self.languageModel)(params, examples), limiter)
+        result = lx.extract(
+            text_or_documents=inputText,
+            prompt_description=self.prompt,
+            examples=examples,
+            model=model,
+            fence_output=params.get('fence_output'),
+            use_schema_constraints=False,  # already applied to the model
+            **{name: params[name] for name in self.DEFAULT_CHUNKING if name in params}
+        )
+        self.lastChunkStats = timer.stats()
+        print(timer.summary())
+        return result
+
+    def estimateUsage(self, inputText):
+        # langextract sends one request per chunk and pass, each one carrying the prompt and examples.
+        # ~4 characters per token
+        chunks = max(1, math.ceil(len(inputText) / self.chunking['max_char_buffer'])) * self.chunking['extraction_passes']
+        promptChars = len(self.prompt) + sum(len(example.text) for example in self.promptExamples(inputText))
+        return chunks, (chunks * promptChars + len(inputText)) // 4
+
     def displayEntitiesWithPosition(self):
         # Display entities with positions
         print(f"Entities with position: \n")
@@ -85,6 +241,12 @@ class LangExtractor():
         print(f"Results saved to test_output/{fileName}.jsonl")
         return f"test_output/{fileName}.jsonl"
 
+    def saveToStore(self, store):
+        # appends the result to a ResultStore (result_store.py) instead of a file of its own
+        entry = store.append(lx.data_lib.annotated_document_to_dict(self.result))
+        print(f"Results saved to {store.storeDir} ({entry['shard']})")
+        return entry
+
     def createHTMLResults(self, fileName):
         # Generate the interactive visualization from the file
         html_content = lx.visualize(self.result)
@@ -0,0 +1,88 @@
+import math, re
+import langextract as lx
+from langextract.core import data, format_handler
+
+# ~4 characters per token, as in LangExtractor.estimateUsage
+CHARS_PER_TOKEN = 4
+
+def extractionPattern(extractionText):
+    # the extraction as written in the example, whatever the line breaks and indentation around its words
+    words = extractionText.split()
+    if not words:
+        return None
+    return re.compile(r'\s+'.join(re.escape(word) for word in words), re.IGNORECASE)
+
+def extractionSpans(text, extractions):
+    # (start, end) of each extraction found in the text, None for the ones it doesn't contain
+    spans, cursor = [], 0
+    for extraction in extractions:
+        pattern = extractionPattern(extraction.extraction_text)
+        match = pattern and (pattern.search(text, cursor) or pattern.search(text))
+        if match:
+            spans.append((match.start(), match.end()))
+            cursor = match.start()
+        else:
+            spans.append(None)
+    return spans
+
+def trimExample(example, context=150, separator=' ... '):
+    # The example text cut down to `context` characters around each of its extractions,
+    # with whitespace collapsed. Extractions found in the original are still found in the
+    # trimmed text, otherwise the original example is returned.
+    spans = extractionSpans(example.text, example.extractions)
+    found = sorted(span for span in spans if span)
+    if not found:
+        return example
+
+    windows = []
+    for start, end in found:
+        start, end = max(0, start - context), min(len(example.text), end + context)
+        # whole words only
+        while start > 0 and not example.text[start - 1].isspace():
+            start -= 1
+        while end < len(example.text) and not example.text[end].isspace():
+            end += 1
+        if windows and start <= windows[-1][1] + len(separator):
+            windows[-1][1] = max(windows[-1][1], end)
+        else:
+            windows.append([start, end])
+
+    text = separator.join(' '.join(example.text[start:end].split()) for start, end in windows)
+    trimmed = data.ExampleData(text=text, extractions=example.extractions)
+    before = [span is not None for span in spans]
+    after = [span is not None for span in extractionSpans(text, example.extractions)]
+    if any(was and not now for was, now in zip(before, after)):
+        return example
+    return trimmed
+
+def promptGenerator(prompt, examples, fenceOutput=True):
+    # renders the prompt the way langextract's Annotator does
+    template = lx.prompting.PromptTemplateStructured(description=prompt)
+    template.examples.extend(examples)
+    handler = format_handler.FormatHandler(format_type=data.FormatType.JSON, use_wrapper=True,
+                                           wrapper_key=data.EXTRACTIONS_KEY, use_fences=fenceOutput)
+    return lx.prompting.QAPromptGenerator(template=template, format_handler=handler)
+
+def profilePrompt(prompt, examples, inputText='', maxCharBuffer=1000, extractionPasses=1, fenceOutput=True):
+    # characters and estimated tokens of one request, split into prompt description,
+    # examples and input chunk, and of the whole note (one request per chunk and pass)
+    generator = promptGenerator(prompt, examples, fenceOutput)
+    description = len(prompt)
+    exampleChars = sum(len(generator.format_example_as_text(example)) for example in examples)
+    total = len(generator.render(''))
+    chunk = min(len(inputText), maxCharBuffer)
+    requests = max(1, math.ceil(len(inputText) / maxCharBuffer)) * extractionPasses
+    perCall = {
+        'description': description,
+        'examples': exampleChars,
+        'input': chunk,
+        # headings and Q/A markers
+        'overhead': total - description - exampleChars,
+    }
+    perCall['total'] = sum(perCall.values())
+    return {
+        'requests': requests,
+        'chars': perCall,
+        'tokens': {part: chars // CHARS_PER_TOKEN for part, chars in perCall.items()},
+        'noteTokens': (requests * (perCall['total'] - chunk) + len(inputText) * extractionPasses) // CHARS_PER_TOKEN,
+    }
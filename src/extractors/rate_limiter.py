@@ -0,0 +1,206 @@
+import asyncio, os, time, threading
+
+# Provider limits per model, as requests per minute and tokens per minute.
+# Override them with RATE_LIMIT_<MODEL>=rpm:tpm (ie. RATE_LIMIT_GPT_4O=500:30000).
+RATE_LIMITS = {
+    'gpt-4o': {'rpm': 500, 'tpm': 30000},
+    'gemini-2.5-pro': {'rpm': 150, 'tpm': 2000000},
+}
+DEFAULT_LIMITS = {'rpm': 60, 'tpm': 100000}
+
+# what the provider SDKs raise when they are throttled (besides a 429 status code)
+THROTTLE_ERRORS = ('RateLimitError', 'ResourceExhausted', 'TooManyRequests')
+
+class TokenBucket():
+    # Refills at `perMinute / 60` units per second, holding at most one second worth of units,
+    # so any sliding minute stays within the limit. Requests bigger than the bucket are allowed
+    # once it is full and leave it in debt.
+
+    def __init__(self, perMinute):
+        self.setRate(perMinute)
+        self.available = self.capacity
+        self.updated = time.monotonic()
+
+    def setRate(self, perMinute):
+        self.perSecond = perMinute / 60.0
+        self.capacity = max(1.0, self.perSecond)
+
+    def refill(self):
+        now = time.monotonic()
+        self.available = min(self.capacity, self.available + (now - self.updated) * self.perSecond)
+        self.updated = now
+
+    def waitTime(self, amount):
+        self.refill()
+        missing = min(amount, self.capacity) - self.available
+        return max(0.0, missing / self.perSecond)
+
+    def take(self, amount):
+        self.refill()
+        self.available -= amount
+
+class RateLimiter():
+    # Keeps the requests to a model under its RPM and TPM, with at most maxInFlight running.
+    # Throttling responses halve the rate and back off exponentially; every success
+    # recovers a bit of the rate (AIMD), so it settles just under the provider limit.
+    # Threads (call) and coroutines (run) share the same budget.
+
+    def __init__(self, rpm, tpm, maxInFlight=32, headroom=0.9):
+        self.rpm = rpm * headroom
+        self.tpm = tpm * headroom
+        self.maxInFlight = maxInFlight
+        self.inFlight = 0
+        self.requests = TokenBucket(self.rpm)
+        self.tokens = TokenBucket(self.tpm)
+        self.factor = 1.0
+        self.backoff = 1.0
+        self.backoffUntil = 0.0
+        self.throttles = 0
+        self.condition = threading.Condition()
+
+    def setMaxInFlight(self, maxInFlight):
+        # the slots already taken stay taken, only new ones see the new limit
+        with self.condition:
+            self.maxInFlight = maxInFlight
+            self.condition.notify_all()
+
+    def tryAcquire(self, requests, tokens):
+        # takes a slot and the budget, or says how long to wait before trying again
+        with self.condition:
+            if self.inFlight >= self.maxInFlight:
+                return None
+            wait = max(self.backoffUntil - time.monotonic(),
+                       self.requests.waitTime(requests),
+                       self.tokens.waitTime(tokens))
+            if wait > 0:
+                return wait
+            self.requests.take(requests)
+            self.tokens.take(tokens)
+            self.inFlight += 1
+            return 0.0
+
+    def acquire(self, requests, tokens):
+        while True:
+            wait = self.tryAcquire(requests, tokens)
+            if wait == 0.0:
+                return
+            with self.condition:
+                # woken up early when a slot is released
+                self.condition.wait(wait if wait is not None else 1.0)
+
+    async def acquireAsync(self, requests, tokens):
+        while True:
+            wait = self.tryAcquire(requests, tokens)
+            if wait == 0.0:
+                return
+            await asyncio.sleep(min(wait, 0.05) if wait is not None else 0.01)
+
+    def release(self):
+        with self.condition:
+            self.inFlight -= 1
+            self.condition.notify_all()
+
+    def throttled(self, retryAfter=None):
+        with self.condition:
+            self.throttles += 1
+            self.setFactor(max(0.1, self.factor * 0.5))
+            self.backoffUntil = time.monotonic() + (retryAfter if retryAfter else self.backoff)
+            self.backoff = min(self.backoff * 2, 60.0)
+
+    def succeeded(self):
+        with self.condition:
+            self.backoff = 1.0
+            if self.factor < 1.0:
+                self.setFactor(min(1.0, self.factor + 0.05))
+
+    def setFactor(self, factor):
+        self.factor = factor
+        self.requests.setRate(self.rpm * factor)
+        self.tokens.setRate(self.tpm * factor)
+
+    def call(self, call, requests=1, tokens=0, retries=5):
+        # call is a function, retried while the provider keeps throttling
+        for attempt in range(retries + 1):
+            self.acquire(requests, tokens)
+            try:
+                result = call()
+            except Exception as e:
+                if attempt < retries and isThrottle(e):
+                    print(f"throttled by the provider, backing off (attempt {attempt + 1})...")
+                    self.throttled(retryAfter(e))
+                    continue
+                raise
+            finally:
+                self.release()
+            self.succeeded()
+            return result
+
+    async def run(self, call, requests=1, tokens=0, retries=5):
+        # same as call(), for a coroutine function
+        for attempt in range(retries + 1):
+            await self.acquireAsync(requests, tokens)
+            try:
+                result = await call()
+            except Exception as e:
+                if attempt < retries and isThrottle(e):
+                    print(f"throttled by the provider, backing off (attempt {attempt + 1})...")
+                    self.throttled(retryAfter(e))
+                    continue
+                raise
+            finally:
+                self.release()
+            self.succeeded()
+            return result
+
+def errorChain(e):
+    # langextract wraps the provider SDK errors, look at the whole chain
+    seen = []
+    while e is not None and e not in seen:
+        seen.append(e)
+        e = getattr(e, 'original', None) or e.__cause__
+    return seen
+
+def isThrottle(e):
+    # by status code or exception type, never by the message (which can mention anything)
+    for err in errorChain(e):
+        if getattr(err, 'status_code', None) == 429 or getattr(err, 'code', None) == 429:
+            return True
+        if type(err).__name__ in THROTTLE_ERRORS:
+            return True
+    return False
+
+def retryAfter(e):
+    for err in errorChain(e):
+        headers = getattr(getattr(err, 'response', None), 'headers', None) or {}
+        try:
+            return float(headers.get('retry-after'))
+        except (TypeError, ValueError):
+            continue
+    return None
+
+def limitsFor(modelId):
+    override = os.getenv('RATE_LIMIT_' + modelId.upper().replace('-', '_').replace('.', '_'))
+    if override:
+        rpm, tpm = override.split(':')
+        return {'rpm': float(rpm), 'tpm': float(tpm)}
+    return RATE_LIMITS.get(modelId, DEFAULT_LIMITS)
+
+_limiters = {}
+_limitersLock = threading.Lock()
+
+def getLimiter(modelId, maxInFlight=None):
+    # one limiter per model and process, every extractor on that model shares its budget
+    with _limitersLock:
+        if modelId not in _limiters:
+            limits = limitsFor(modelId)
+            _limiters[modelId] = RateLimiter(limits['rpm'], limits['tpm'],
+                                             maxInFlight=maxInFlight or int(os.getenv('MAX_IN_FLIGHT', '32')))
+        elif maxInFlight and maxInFlight != _limiters[modelId].maxInFlight:
+            _limiters[modelId].setMaxInFlight(maxInFlight)
+        return _limiters[modelId]
+
+def setLimiter(modelId, limiter):
+    # replaces the limiter every extractor on that model shares (ie. one matching a stand-in)
+    with _limitersLock:
+        _limiters[modelId] = limiter
+    return limiter
@@ -0,0 +1,21 @@
+import importlib
+
+# Extractor name -> (module, class). Modules are imported when an extractor is first used,
+# so parsing arguments (or using one extractor) doesn't import langextract and every extractor.
+EXTRACTORS = {
+    'meds': ('extractors.focus_on_meds', 'ExtractorFocusOnMeds'),
+    'trauma': ('extractors.focus_on_trauma', 'ExtractorFocusOnTrauma'),
+    'general': ('extractors.general_extractor', 'GeneralExtractor'),
+}
+
+def names():
+    return list(EXTRACTORS)
+
+def extractorClass(name):
+    if name not in EXTRACTORS:
+        raise ValueError(f"unknown extractor {name}, must be one of {', '.join(EXTRACTORS)}")
+    module, className = EXTRACTORS[name]
+    return getattr(importlib.import_module(module), className)
+
+def newExtractor(name, model='OPENAI'):
+    return extractorClass(name)(model)
@@ -0,0 +1,178 @@
+import hashlib, json, re, unicodedata
+from datetime import datetime, timezone
+from canonicalizer import getCanonicalizer
+
+known_classes = ["medication", "diagnosis", "condition", "treatment"]
+
+# characters ArangoDB accepts in a _key, everything else gets percent-encoded
+KEY_SAFE = re.compile(r"[^A-Za-z0-9_\-:.@()+,=;$!*']")
+MAX_KEY_BYTES = 254
+
+class GraphBuilder():
+    # Builds the graph (document, entities, relationships) of one annotated document.
+    # Entity keys already added are kept in a set, so duplicates are found in O(1).
+
+    def __init__(self, document_id, text, source=''):
+        self.document = {
+            '_key': document_id,
+            'content': text,
+            'analyzed_at': datetime.now(timezone.utc).isoformat(),
+            'source': source
+        }
+        self.entities = []
+        self.relationships = []
+        self.entityKeys = set()
+        # canonical name -> key of the known entities of this document, so relationships
+        # (which only name their entities) point at them
+        self.knownKeys = {}
+        self.medicationKeys = {}
+
+    @classmethod
+    def fromAnnotatedDocument(cls, line):
+        # line is an annotated document as saved by LangExtractor.saveResults
+        builder = cls(line['document_id'], line['text'])
+        print(f"processing document {builder.document['_key']}")
+
+        # add entities related back to the document, then the relationships between them
+        for extraction in line['extractions']:
+            if extraction['extraction_class'] != 'relationship':
+                builder.addExtraction(extraction)
+        for extraction in line['extractions']:
+            if extraction['extraction_class'] == 'relationship':
+                builder.addExtraction(extraction)
+        return builder
+
+    def addExtraction(self, extraction):
+        if extraction['extraction_class'] == 'relationship':
+            # we now can create relationships between entities
+            self.addRelationship(extraction)
+        else:
+            self.addEntity(extraction)
+
+    def addEntity(self, extraction):
+        if extraction['extraction_class'] == 'relationship':
+            # this is a relationship not an entity. Do nothing.
+            return False
+
+        if extraction['extraction_class'] in known_classes:
+            # if the class is known (ie. "medication", "diagnosis", "condition", "treatment") the key is the
+            # canonical form of the extraction_text, so "Olanzapine 10 mg" and "tab. olanzapine" are one entity
+            canonicalizer = getCanonicalizer()
+            extraction['canonical_name'] = canonicalizer.canonical(extraction["extraction_text"], extraction['extraction_class'])
+            extraction['_key'] = canonicalKey(extraction["extraction_text"], extraction['extraction_class'])
+            self.knownKeys.setdefault(canonicalizer.canonical(extraction["extraction_text"]), extraction['_key'])
+            if extraction['extraction_class'] == 'medication':
+                self.medicationKeys.setdefault(extraction['canonical_name'], extraction['_key'])
+
+        else:
+            # otherwise, it's a unique entity (ie symptoms, other), keyed by where it was found,
+            # so re-ingesting the same output updates the same entity
+            # TODO do demographics
+            extraction['_key'] = mentionKey(self.document['_key'], extraction)
+
+        if extraction['_key'] in self.entityKeys:
+            print(f"found entity {extraction['_key']} duplicated, skipping insertion of entity")
+            return False
+
+        print(f"inserting entity {extraction['_key']} with rel to document {self.document['_key']}")
+
+        # Insert relationship entity - document
+        ent_rel_doc = {
+                        '_key': extractionEdgeKey(self.document['_key'], extraction['_key']),
+                        '_from': f"documents/{self.document['_key']}",
+                        '_to': f"entities/{extraction['_key']}",
+                        'relationship_type': 'extraction',
+                        'char_interval': extraction['char_interval'],
+                        'alignment_status':  extraction['alignment_status'],
+                        'confidence': confidenceFromAlignment(extraction['alignment_status'])
+                    }
+        self.entityKeys.add(extraction['_key'])
+        self.entities.append(extraction)
+        self.relationships.append(ent_rel_doc)
+        return True
+
+    def addRelationship(self, extraction):
+        # link the entities among themselves
+        if extraction['extraction_class'] != 'relationship':
+            print("this extraction is not a relationship")
+            return False
+
+        entity1_key = self.relatedKey(extraction['attributes']['entity_1'])
+        entity2_key = self.relatedKey(extraction['attributes']['entity_2'])
+
+        # Create order-independent key (alphabetical sorting)
+        sorted_entities = sorted([entity1_key, entity2_key])
+        relationship_key = arangoKey(f"{sorted_entities[0]}_assoc_{sorted_entities[1]}")
+
+        print(f"creating relationship between {entity1_key} and {entity2_key}")
+
+        # Insert relationship entity - entity
+        ent_rel_ent = {
+                        '_key': relationship_key,
+                        '_from': f"entities/{entity1_key}",
+                        '_to': f"entities/{entity2_key}",
+                        'relationship_type': 'associated',
+                        'alignment_status':  extraction['alignment_status'],
+                        'confidence': confidenceFromAlignment(extraction['alignment_status'])
+                    }
+        self.relationships.append(ent_rel_ent)
+        return True
+
+    def relatedKey(self, text):
+        # relationships don't say the class of their entities: the entity of this document
+        # written the same way, else a medication of this document once its dose and form are
+        # stripped, else the key of a condition (nothing stripped)
+        canonicalizer = getCanonicalizer()
+        plain = canonicalizer.canonical(text)
+        if plain in self.knownKeys:
+            return self.knownKeys[plain]
+        medication = canonicalizer.canonical(text, 'medication')
+        if medication in self.medicationKeys:
+            return self.medicationKeys[medication]
+        return canonicalKey(text)
+
+    def graphData(self):
+        return {
+            'document': self.document,
+            'entities': self.entities,
+            'relationships': self.relationships
+        }
+
+def confidenceFromAlignment(alignment_status):
+    match alignment_status:
+        case 'match_exact':
+            return 1
+        case 'match_fuzzy':
+            return 0.6
+        case 'match_lesser':
+            return 0.3
+        case _:
+            return 0
+
+def arangoKey(text):
+    # Percent-encodes the characters not allowed in a _key ('%' included), so different
+    # texts always give different keys. Keys too long for ArangoDB fall back to a digest.
+    key = KEY_SAFE.sub(lambda match: ''.join(f"%{byte:02X}" for byte in match.group().encode('utf-8')), text)
+    if len(key) > MAX_KEY_BYTES:
+        key = key[:MAX_KEY_BYTES - 65] + '_' + hashlib.sha256(key.encode('utf-8')).hexdigest()
+    return key
+
+def canonicalKey(text, extractionClass=None):
+    # key of the known classes, shared by every document that mentions them
+    # (relationships name their entities the same way, so they point at the same keys)
+    return arangoKey(getCanonicalizer().canonical(text, extractionClass).replace(" ","_"))
+
+def normalizeText(text):
+    return ' '.join(unicodedata.normalize('NFKC', text).casefold().split())
+
+def mentionKey(document_id, extraction):
+    # deterministic key of an entity that only exists in one place of one document
+    interval = extraction.get('char_interval') or {}
+    identity = json.dumps([document_id, extraction['extraction_class'], normalizeText(extraction['extraction_text']),
+                           interval.get('start_pos'), interval.get('end_pos')])
+    return arangoKey(extraction['extraction_class']) + '_' + hashlib.sha256(identity.encode('utf-8')).hexdigest()
+
+def extractionEdgeKey(document_key, entity_key):
+    # stable key of the document -> entity edge, so replays update it instead of adding another
+    identity = json.dumps([document_key, entity_key])
+    return 'extraction_' + hashlib.sha256(identity.encode('utf-8')).hexdigest()
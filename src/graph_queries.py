@@ -0,0 +1,139 @@
+import copy, threading, time
+from collections import OrderedDict
+
+class QueryCache():
+    # LRU cache of query results. Each entry remembers the vertices it involves (its arguments
+    # and the vertices in its result), so ingestion can drop exactly the entries it may have
+    # changed. The ttl covers writes made by other processes, which can't invalidate us.
+
+    def __init__(self, maxsize=1024, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.entries = OrderedDict()  # key -> (stored at, result, involved vertices)
+        self.byVertex = {}  # vertex -> keys of the entries involving it
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or (self.ttl and time.monotonic() - entry[0] > self.ttl):
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, result, vertices):
+        with self.lock:
+            self.drop(key)
+            self.entries[key] = (time.monotonic(), result, vertices)
+            for vertex in vertices:
+                self.byVertex.setdefault(vertex, set()).add(key)
+            while len(self.entries) > self.maxsize:
+                self.drop(next(iter(self.entries)))
+
+    def invalidate(self, vertices):
+        with self.lock:
+            for vertex in vertices:
+                for key in list(self.byVertex.get(vertex, ())):
+                    self.drop(key)
+
+    def drop(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return
+        for vertex in entry[2]:
+            keys = self.byVertex.get(vertex)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.byVertex[vertex]
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.byVertex.clear()
+
+# shared by every GraphQueries of the process, ProcessOutput invalidates it as it writes
+resultCache = QueryCache()
+
+def invalidate(vertices):
+    resultCache.invalidate(vertices)
+
+class GraphQueries():
+    # Queries over the entity graph: the `associated` edges between entities and the
+    # `extraction` edges from documents to the entities they mention.
+    # Entities are given by _key (ie. "olanzapine").
+
+    def __init__(self, db=None, batchSize=1000, cache=resultCache):
+        if db is None:
+            import arango_session
+            db = arango_session.getDatabase()
+        self.db = db
+        self.batchSize = batchSize
+        self.cache = cache
+
+    def neighbors(self, entity, depth=1):
+        # entities reachable through `associated` edges, up to depth hops away. The traversal
+        # stops at any other edge (the `extraction` edges to documents), so only the
+        # `associated` ones are expanded. PRUNE also runs on the start vertex, where edge is null
+        aql = '''
+        FOR vertex, edge, path IN 1..@depth ANY @start relationships
+            PRUNE edge != null AND edge.relationship_type != 'associated'
+            OPTIONS { order: 'bfs', uniqueVertices: 'global' }
+            FILTER edge.relationship_type == 'associated'
+            RETURN {
+                key: vertex._key,
+                extraction_class: vertex.extraction_class,
+                extraction_text: vertex.extraction_text,
+                depth: LENGTH(path.edges)
+            }
+        '''
+        return self.cached(('neighbors', entity, depth), [entity], aql,
+                           {'start': f"entities/{entity}", 'depth': depth},
+                           lambda row: row['key'])
+
+    def topCoAssociated(self, entity, limit=10):
+        # entities most often associated with this one, weighted by the edge count
+        aql = '''
+        FOR edge IN relationships
+            FILTER (edge._from == @start OR edge._to == @start) AND edge.relationship_type == 'associated'
+            LET other = edge._from == @start ? edge._to : edge._from
+            COLLECT key = PARSE_IDENTIFIER(other).key AGGREGATE weight = SUM(edge.count)
+            SORT weight DESC
+            LIMIT @limit
+            RETURN { key: key, weight: weight }
+        '''
+        return self.cached(('topCoAssociated', entity, limit), [entity], aql,
+                           {'start': f"entities/{entity}", 'limit': limit},
+                           lambda row: row['key'])
+
+    def documentsMentioningBoth(self, entity_a, entity_b):
+        # keys of the documents with an extraction of both entities
+        aql = '''
+        FOR mention_a IN relationships
+            FILTER mention_a._to == @a AND mention_a.relationship_type == 'extraction'
+            FOR mention_b IN relationships
+                FILTER mention_b._to == @b AND mention_b._from == mention_a._from
+                    AND mention_b.relationship_type == 'extraction'
+                RETURN DISTINCT PARSE_IDENTIFIER(mention_a._from).key
+        '''
+        return self.cached(('documentsMentioningBoth', entity_a, entity_b), [entity_a, entity_b], aql,
+                           {'a': f"entities/{entity_a}", 'b': f"entities/{entity_b}"},
+                           None)
+
+    def cached(self, key, entities, aql, bind_vars, resultEntity):
+        # the cache holds a tuple and callers get their own copy, so they can't change it
+        result = self.cache.get(key) if self.cache else None
+        if result is not None:
+            return copy.deepcopy(list(result))
+
+        result = list(self.db.aql.execute(aql, bind_vars=bind_vars, batch_size=self.batchSize))
+        if self.cache:
+            vertices = {f"entities/{entity}" for entity in entities}
+            if resultEntity:
+                vertices.update(f"entities/{resultEntity(row)}" for row in result)
+            self.cache.put(key, tuple(copy.deepcopy(result)), vertices)
+        return result
@@ -1,20 +1,83 @@
-import argparse, sys, os
+import argparse, contextlib, glob, sys, os
 from processOutput import ProcessOutput
+from storage.memory_store import MemoryGraphStore
+from result_store import ResultStore
 
 parser=argparse.ArgumentParser(description="Just process output without re-generating")
-parser.add_argument('local_path', type=str, help="local path to the output file")
+parser.add_argument('local_path', type=str, nargs='*', help="output files, result store directories, directories of *.jsonl or glob patterns")
+parser.add_argument('--batch-size', type=int, default=None, help="store this many documents per round trip (default: one document at a time, 500 when ingesting in parallel)")
+parser.add_argument('--workers', type=int, default=None, help="processes parsing and building the graph data (default: every core). Directories, globs and several paths always ingest in parallel")
+parser.add_argument('--writers', type=int, default=1, help="connections writing to ArangoDB in parallel")
+parser.add_argument('--queue-size', type=int, default=8, help="built parts waiting for each writer before the workers are held back")
+parser.add_argument('--log', type=str, default='logs/ingest.log', help="where the per batch messages of parallel ingestion go (errors are also printed to stderr)")
+parser.add_argument('--force', action='store_true', help="ingest again files and documents the ingestion ledger already has")
+parser.add_argument('--memory-snapshot', type=str, default=None, help="ingest into an in-memory graph instead of ArangoDB, loaded from and saved to this file")
+parser.add_argument('--compact-edges', action='store_true', help="collapse duplicated document-entity edges left by earlier ingestions")
 args = parser.parse_args()
 
-po = ProcessOutput()
+if not args.local_path and not args.compact_edges:
+    parser.error("you need to specify an output file and/or --compact-edges")
+if args.compact_edges and args.memory_snapshot:
+    parser.error("--compact-edges only applies to ArangoDB")
+if args.writers > 1 and args.memory_snapshot:
+    parser.error("the in-memory graph takes a single writer")
 
-if os.path.isfile(args.local_path) and os.access(args.local_path, os.R_OK):
-    # if exist, attempt to ingest
-    print(f"processing local file...")
-    po.ingestOutput(args.local_path)
-    
+if args.memory_snapshot:
+    if os.path.isfile(args.memory_snapshot):
+        store = MemoryGraphStore.load(args.memory_snapshot)
+    else:
+        store = MemoryGraphStore()
+    po = ProcessOutput(store=store)
 else:
-    # if not, error
-    print("that file does not exist or can't be read")
-    sys.exit()
+    po = ProcessOutput()
+
+if args.compact_edges:
+    print(f"compacting document-entity edges...")
+    po.compactExtractionEdges()
+
+if args.local_path:
+    from parallel_ingest import expandPaths
+    paths = expandPaths(args.local_path)
+    for path in paths:
+        if not ResultStore.isStore(path) and not (os.path.isfile(path) and os.access(path, os.R_OK)):
+            # if not, error
+            print(f"{path} does not exist or can't be read")
+            sys.exit()
+
+    # one file or one store, as given, is ingested as before unless --workers asks otherwise
+    first = args.local_path[0]
+    single = len(args.local_path) == 1 and (ResultStore.isStore(first) or not (os.path.isdir(first) or glob.has_magic(first)))
+    if not paths:
+        print("no output files found")
+
+    elif single and args.workers is None and ResultStore.isStore(paths[0]):
+        print(f"processing result store...")
+        po.ingestStore(ResultStore(paths[0]), batchSize=args.batch_size, force=args.force)
+
+    elif single and args.workers is None:
+        # if exist, attempt to ingest
+        print(f"processing local file...")
+        po.ingestOutput(paths[0], batchSize=args.batch_size, force=args.force)
+
+    else:
+        from parallel_ingest import ParallelIngest
+        # a connection per writer, the in-memory graph is the only one
+        newOutput = (lambda: po) if args.memory_snapshot else ProcessOutput
+        ingest = ParallelIngest(newOutput, workers=args.workers, writers=args.writers, batchSize=args.batch_size or 500,
+                                queueSize=args.queue_size, force=args.force)
+        print(f"processing {len(paths)} inputs with {ingest.workers} workers and {ingest.writers} writers...")
+        # the writers' messages would break the progress line, they go to the log
+        os.makedirs(os.path.dirname(args.log) or '.', exist_ok=True)
+        with open(args.log, 'a') as log, contextlib.redirect_stdout(log):
+            summary = ingest.run(paths)
+        print(f"messages logged to {args.log}")
+        print(f"ingested {summary['ingested']} documents, {summary['skipped']} unchanged skipped, "
+              f"from {summary['files']} inputs in {summary['seconds']:.1f}s: "
+              f"{summary['documents'] / summary['seconds'] if summary['seconds'] else 0:.0f} docs/sec "
+              f"({summary['parts']} parts parsed, {summary['batches']} batches written)")
+
+if args.memory_snapshot:
+    po.store.snapshot(args.memory_snapshot)
+    print(f"graph: {po.store.counts()}")
 
 print(f"done")
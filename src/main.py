@@ -1,58 +1,189 @@
-import pandas as pd
-from extractors.focus_on_meds import ExtractorFocusOnMeds
-from extractors.focus_on_trauma import ExtractorFocusOnTrauma
-from extractors.general_extractor import GeneralExtractor
-import argparse, sys, os
-from processOutput import ProcessOutput
+import argparse, sys, time, threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from extractors import registry
+
+def parseRecords(spec):
+    # accepts a comma separated list of indices and/or ranges (ie. "0-99,120,130-140")
+    records = []
+    for part in spec.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        if '-' in part:
+            start, end = part.split('-', 1)
+            records.extend(range(int(start), int(end) + 1))
+        else:
+            records.append(int(part))
+    return records
 
 parser=argparse.ArgumentParser(description="Analyze clinical notes to extract structured data")
-parser.add_argument('type', type=str, help='Type of extractor to use (meds | trauma | general)', choices=["meds", "trauma", "general"])
-parser.add_argument('record', type=int, help='Target Record in AGBonnet (see https://huggingface.co/datasets/AGBonnet/augmented-clinical-notes)')
+parser.add_argument('type', type=str, help=f"Type of extractor to use ({' | '.join(registry.names())})", choices=registry.names())
+parser.add_argument('record', type=int, nargs='?', help='Target Record in AGBonnet (see https://huggingface.co/datasets/AGBonnet/augmented-clinical-notes)')
+parser.add_argument('--records', type=str, help='Batch mode: records to extract, as a list and/or ranges (ie. 0-99,120,130-140)')
+parser.add_argument('--records-file', type=str, help='Batch mode: file with one record index per line')
+parser.add_argument('--no-cache', action='store_true', help='Always call the LLM, even if the same extraction was done before')
+parser.add_argument('--workers', type=int, default=4, help='Batch mode: number of extractions running at the same time (default 4)')
+parser.add_argument('--max-char-buffer', type=int, help="Characters per chunk of the note (default: the extractor's)")
+parser.add_argument('--batch-length', type=int, help="Chunks sent to the model per batch (default: the extractor's)")
+parser.add_argument('--chunk-workers', type=int, help="Requests in flight per extraction (default: the extractor's)")
+parser.add_argument('--extraction-passes', type=int, help="Times each note is read, more passes find more entities (default: the extractor's)")
+parser.add_argument('--max-in-flight', type=int, help='Requests to the model running at once across the workers, under its RPM/TPM limits (default: MAX_IN_FLIGHT or 32)')
+parser.add_argument('--prompt-budget', type=int, metavar='CHARS', help='Send the examples trimmed to CHARS characters around each of their extractions')
+parser.add_argument('--store', type=str, metavar='DIR', help='Append the results to a sharded, compressed result store in DIR instead of one JSONL file per record')
+parser.add_argument('--html', action='store_true', help='Also write an HTML visualization per record (otherwise render them later with visualize.py)')
+parser.add_argument('--base-url', type=str, help='Send the OpenAI requests to another endpoint, ie. a local stand-in (http://127.0.0.1:8089/v1)')
+parser.add_argument('--metrics', type=str, default='metrics/metrics', metavar='PREFIX',
+                    help='Write stage timings and counters to PREFIX.jsonl (events) and PREFIX.prom (Prometheus text format)')
+parser.add_argument('--example-bank', type=str, nargs='?', const='', metavar='DIR', help="Pick the few-shot examples closest to each note among windows of the extractor's own examples, plus the examples of DIR if given")
+parser.add_argument('--examples-k', type=int, default=2, help='With --example-bank: examples per prompt (default 2)')
 args = parser.parse_args()
 
-match args.type:
-    case "meds":
-        extractor = ExtractorFocusOnMeds("OPENAI")
-    case "trauma":
-        extractor = ExtractorFocusOnTrauma("OPENAI")
-    case "general":
-        extractor = GeneralExtractor("OPENAI")
-    case _:
-        print(f"you need to specify a type of extractor (meds, trauma, general)")
-        sys.exit()
+records = []
+if args.record is not None:
+    records.append(args.record)
+if args.records:
+    records.extend(parseRecords(args.records))
+if args.records_file:
+    with open(args.records_file, 'r') as f:
+        for line in f:
+            records.extend(parseRecords(line))
+# remove duplicates, keep the order
+records = list(dict.fromkeys(records))
 
+if not records:
+    parser.error("you need to specify a record, --records or --records-file")
+if args.workers < 1:
+    parser.error("--workers must be at least 1")
+
+# the heavy imports (langextract, the DB driver) only once the arguments are valid
+from processOutput import ProcessOutput
+from dataset import AGBonnetDataset
+from extractors.extraction_cache import getSharedCache
+from metrics import metrics
+
+metrics.configure(args.metrics + '.jsonl')
+metrics.event('run', type=args.type, records=len(records), workers=args.workers)
 print(f"using an extractor specialized on {args.type}")
 
-local_path = 'data/agbonnet.json'
-if os.path.isfile(local_path) and os.access(local_path, os.R_OK):
-    # if already downloaded, load from local
-    print(f"using local data...")
-    df = pd.read_json(local_path)
-else:
-    # if not, download and store
-    print(f"downloading data from HuggingFace... wait...\n")
-    df = pd.read_json("hf://datasets/AGBonnet/augmented-clinical-notes/augmented_notes_30K.jsonl", lines=True)
-    df.to_json('data/agbonnet.json', orient='records', indent=2)
-    print(f"data downloaded. Continuing...\n")
-
-i = args.record
-input_text = df.iloc[i].full_note
-print(f"using 'full_note' from record {i} as input text: \n{input_text[:80]}...")
+# downloaded the first time, then read record by record from the local copy
+with metrics.stage('dataset_load'):
+    dataset = AGBonnetDataset()
+print(f"using local data ({len(dataset)} records)...")
 
 # creating processor now, so we stop if DB is not available
-po = ProcessOutput()
+with metrics.stage('db_connect'):
+    po = ProcessOutput()
+
+# results go to one store shared by the workers, or to a file per record
+resultStore = None
+if args.store:
+    from result_store import ResultStore
+    resultStore = ResultStore(args.store)
+
+# loaded once, shared by every worker
+exampleBank = None
+if args.example_bank is not None:
+    from extractors.example_bank import ExampleBank
+    exampleBank = ExampleBank.fromExtractor(registry.newExtractor(args.type), k=args.examples_k, bankDir=args.example_bank or None)
+    print(f"picking {args.examples_k} of {len(exampleBank)} examples per prompt")
+
+# extractors keep the input and result of the last extraction, so each worker gets its own
+workerState = threading.local()
+# a single DB writer at a time, the LLM calls are the ones we want to overlap
+ingestLock = threading.Lock()
+# chunk count and latencies of every extraction that called the model
+chunkStats = []
+statsLock = threading.Lock()
+
+def processRecord(i):
+    if not hasattr(workerState, 'extractor'):
+        workerState.extractor = registry.newExtractor(args.type)
+        workerState.extractor.setBypassCache(args.no_cache)
+        workerState.extractor.setChunking(args.max_char_buffer, args.batch_length, args.chunk_workers, args.extraction_passes)
+        workerState.extractor.setPromptBudget(args.prompt_budget)
+        workerState.extractor.setBaseUrl(args.base_url)
+        workerState.extractor.setRateLimit(True, args.max_in_flight)
+        if exampleBank:
+            workerState.extractor.setExamples(exampleBank)
+    extractor = workerState.extractor
+
+    with metrics.stage('read_note', record=i):
+        input_text = dataset.getNote(i)
+    print(f"using 'full_note' from record {i} as input text: \n{input_text[:80]}...")
+
+    # now extract
+    extractor.setInputText(input_text)
+    with metrics.stage('extract', record=i):
+        result =  extractor.extract()
+        if not result:
+            raise RuntimeError(f"extraction failed for record {i}")
+    extractions = len(result.extractions or [])
+    metrics.count('extractions_total', extractions)
+    metrics.observe('extractions_per_document', extractions)
+    metrics.event('document', record=i, characters=len(input_text), extractions=extractions,
+                  requests=(extractor.lastChunkStats or {}).get('requests'))
+    if extractor.lastChunkStats:
+        with statsLock:
+            chunkStats.append(extractor.lastChunkStats)
+        extractor.lastChunkStats = None
+
+    # save them
+    with metrics.stage('save', record=i):
+        if resultStore:
+            saved = extractor.saveToStore(resultStore)
+        else:
+            saved = extractor.saveResults('sample_output_' + args.type + str(i))
+    if args.html:
+        with metrics.stage('html', record=i):
+            extractor.createHTMLResults("sample_view_" + args.type + str(i))
+
+    # now to the database
+    print(f"attempt to save on database...")
+    with ingestLock, metrics.stage('ingest', record=i):
+        if resultStore:
+            po.ingestDocuments([resultStore.get(saved['document_id'])], args.store)
+        else:
+            po.ingestOutput(saved)
+    return i
 
-# now extract
-extractor.setInputText(input_text)
-result =  extractor.extract()
+started = time.perf_counter()
+done, failed = 0, []
+with ThreadPoolExecutor(max_workers=min(args.workers, len(records))) as pool:
+    futures = {pool.submit(processRecord, i): i for i in records}
+    for future in as_completed(futures):
+        try:
+            future.result()
+            done += 1
+            print(f"✅ record {futures[future]} done ({done + len(failed)}/{len(records)})")
+        except Exception as e:
+            failed.append(futures[future])
+            print(f"❌ record {futures[future]} failed: {e}")
+elapsed = time.perf_counter() - started
 
-# save them
-fileName = 'sample_output_' + args.type + str(args.record)
-saved = extractor.saveResults(fileName)
-extractor.createHTMLResults("sample_view_" + args.type + str(args.record))
+if len(records) > 1:
+    print(f"processed {done} records in {elapsed:.1f}s with {args.workers} workers "
+          f"({done / elapsed:.2f} records/s, {done * 60 / elapsed:.1f} records/min)")
+    if failed:
+        print(f"failed records: {','.join(str(i) for i in sorted(failed))}")
+if chunkStats:
+    requests = sum(stats['requests'] for stats in chunkStats)
+    print(f"{requests} requests in {len(chunkStats)} extractions ({requests / len(chunkStats):.1f} per note), "
+          f"per request latency mean {sum(stats['mean'] * stats['requests'] for stats in chunkStats) / max(1, requests):.2f}s, "
+          f"worst p95 {max(stats['p95'] for stats in chunkStats):.2f}s, "
+          f"extraction wall time mean {sum(stats['wall'] for stats in chunkStats) / len(chunkStats):.1f}s")
+if not args.no_cache:
+    cacheStats = getSharedCache().stats()
+    print(f"extraction cache: {cacheStats['hits']} hits, {cacheStats['misses']} misses")
 
-# now to the database
-print(f"attempt to save on database...")
-po.ingestOutput(saved)
+# where the time went
+for stage, (runs, seconds) in metrics.summary().items():
+    print(f"  {stage:<12} {runs:>6} runs {seconds:>9.2f}s total {seconds / runs:>8.3f}s mean")
+metrics.writePrometheus(args.metrics + '.prom')
+metrics.configure(None)
+print(f"metrics saved to {args.metrics}.jsonl and {args.metrics}.prom")
 
+if failed:
+    # so callers and shell loops see it, as when a single extraction raised
+    print(f"done, {len(failed)} of {len(records)} records failed")
+    sys.exit(1)
 print(f"done")
@@ -0,0 +1,132 @@
+import json, os, threading, time
+from contextlib import contextmanager
+
+# Lightweight pipeline instrumentation: counters, histograms and a timer per stage.
+# Every stage run is also written as an event to a JSON lines file (when configured), and
+# the totals can be exported in Prometheus text format (ie. for node_exporter's textfile collector).
+
+NAMESPACE = 'graphextractor'
+
+SECONDS = (0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+BUCKETS = {
+    'stage_seconds': SECONDS,
+    'extractions_per_document': (1, 5, 10, 25, 50, 100, 250, 500),
+}
+
+HELP = {
+    'stage_seconds': 'Time spent in each pipeline stage',
+    'stage_total': 'Pipeline stage runs, by outcome',
+    'extractions_per_document': 'Extractions returned for each document',
+    'extractions_total': 'Extractions returned by the model',
+    'documents_ingested_total': 'Documents written to the graph',
+    'documents_skipped_total': 'Documents skipped because they were already ingested unchanged',
+    'entities_written_total': 'Entities written to the graph store',
+    'edges_written_total': 'Relationships written to the graph store',
+    'db_round_trips_total': 'Requests sent to the database, by operation',
+}
+
+class Metrics():
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {}  # (name, labels) -> value
+        self.histograms = {}  # (name, labels) -> [bucket counts..., count, sum]
+        self.events = None
+
+    def configure(self, jsonlPath=None):
+        # where to append the events, None to stop writing them
+        with self.lock:
+            if self.events:
+                self.events.close()
+                self.events = None
+            if jsonlPath:
+                os.makedirs(os.path.dirname(jsonlPath) or '.', exist_ok=True)
+                self.events = open(jsonlPath, 'a', buffering=1)
+
+    def count(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        buckets = BUCKETS[name]
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = [0] * (len(buckets) + 2)
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    histogram[i] += 1
+            histogram[-2] += 1
+            histogram[-1] += value
+
+    def event(self, kind, **fields):
+        if self.events is None:
+            return
+        line = json.dumps({'ts': time.time(), 'event': kind, **fields}, default=str)
+        with self.lock:
+            if self.events:
+                self.events.write(line + '\n')
+
+    @contextmanager
+    def stage(self, name, **fields):
+        # times a stage: with metrics.stage('extract', record=i): ...
+        started = time.perf_counter()
+        outcome = 'error'
+        try:
+            yield
+            outcome = 'ok'
+        finally:
+            seconds = time.perf_counter() - started
+            self.observe('stage_seconds', seconds, stage=name)
+            self.count('stage_total', stage=name, outcome=outcome)
+            self.event('stage', stage=name, seconds=round(seconds, 6), outcome=outcome, **fields)
+
+    def value(self, name, **labels):
+        return self.counters.get((name, tuple(sorted(labels.items()))), 0)
+
+    def summary(self):
+        # {stage: (runs, total seconds)}
+        with self.lock:
+            return {dict(labels)['stage']: (histogram[-2], histogram[-1])
+                    for (name, labels), histogram in self.histograms.items() if name == 'stage_seconds'}
+
+    def prometheus(self):
+        with self.lock:
+            counters = sorted(self.counters.items())
+            histograms = sorted(self.histograms.items())
+
+        lines, described = [], set()
+        def describe(name, kind):
+            if name not in described:
+                described.add(name)
+                lines.append(f"# HELP {NAMESPACE}_{name} {HELP.get(name, name)}")
+                lines.append(f"# TYPE {NAMESPACE}_{name} {kind}")
+
+        for (name, labels), value in counters:
+            describe(name, 'counter')
+            lines.append(f"{NAMESPACE}_{name}{formatLabels(labels)} {value}")
+        for (name, labels), histogram in histograms:
+            describe(name, 'histogram')
+            for bound, count in zip(BUCKETS[name], histogram):
+                lines.append(f"{NAMESPACE}_{name}_bucket{formatLabels(labels + (('le', bound),))} {count}")
+            lines.append(f"{NAMESPACE}_{name}_bucket{formatLabels(labels + (('le', '+Inf'),))} {histogram[-2]}")
+            lines.append(f"{NAMESPACE}_{name}_count{formatLabels(labels)} {histogram[-2]}")
+            lines.append(f"{NAMESPACE}_{name}_sum{formatLabels(labels)} {histogram[-1]}")
+        return '\n'.join(lines) + '\n'
+
+    def writePrometheus(self, path):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path + '.tmp', 'w') as f:
+            f.write(self.prometheus())
+        os.replace(path + '.tmp', path)
+
+def formatLabels(labels):
+    if not labels:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in labels)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(labels, escaped)) + '}'
+
+# shared by the whole process, like graph_queries.resultCache
+metrics = Metrics()
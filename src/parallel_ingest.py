@@ -0,0 +1,246 @@
+import glob, json, os, queue, sys, threading, time, zlib
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from metrics import metrics
+from processOutput import ProcessOutput
+from result_store import ResultStore
+
+# Ingestion of many outputs at once (a folder of JSONL files, globs, result stores).
+# Parsing and building the graph data are CPU-bound, so they run in a process pool over
+# parts of the inputs (byte ranges of the files, runs of documents of a store). The built
+# graphs go, in input order, through a bounded queue per writer to one or more writer
+# threads, each with its own store, which check the ledger and write them in batches.
+# A document always goes to the same writer, so two writers never race on its ledger entry,
+# and the writers take turns on the entity and relationship upserts, which every batch
+# shares (common drugs...), instead of conflicting in ArangoDB.
+
+PART_BYTES = 8 * 1024 * 1024
+
+def expandPaths(paths):
+    # files, result stores, directories (every *.jsonl in them, buildPart skips the lines that
+    # are not annotated documents) and glob patterns, in order and without repeats
+    files = []
+    for path in paths:
+        if ResultStore.isStore(path):
+            files.append(path)
+        elif os.path.isdir(path):
+            files.extend(sorted(glob.glob(os.path.join(path, '*.jsonl'))))
+        elif glob.has_magic(path):
+            files.extend(sorted(glob.glob(path, recursive=True)))
+        else:
+            files.append(path)
+    return list(dict.fromkeys(files))
+
+def planParts(paths, partBytes=PART_BYTES):
+    # (kind, path, ...) units of work: JSONL files cut in byte ranges, stores in runs of documents
+    parts = []
+    for path in paths:
+        if ResultStore.isStore(path):
+            store = ResultStore(path).refresh()
+            run, size = [], 0
+            for entry in sorted(store.entries.values(), key=lambda entry: (entry['shard'], entry['offset'])):
+                if run and (entry['shard'] != run[0][0] or size + entry['length'] > partBytes):
+                    parts.append(('store', path, run))
+                    run, size = [], 0
+                run.append((entry['shard'], entry['offset'], entry['length']))
+                size += entry['length']
+            if run:
+                parts.append(('store', path, run))
+        else:
+            size = os.path.getsize(path)
+            for start in range(0, size, partBytes):
+                parts.append(('jsonl', path, start, min(start + partBytes, size)))
+    return parts
+
+def quiet():
+    # GraphBuilder prints every document, the workers keep it to themselves
+    sys.stdout = open(os.devnull, 'w')
+
+def buildPart(part):
+    # runs in a worker process: the (document_id, hash, graph_data, source) of a part
+    built = []
+    for line in readPart(part):
+        if 'document_id' not in line:
+            print(f"⚠️ skipping a line of {part[1]} that is not an annotated document", file=sys.stderr)
+            continue
+        built.append((line['document_id'], ProcessOutput.documentHash(line),
+                      ProcessOutput.buildGraphData(line), part[1]))
+    return built
+
+def readPart(part):
+    if part[0] == 'store':
+        store = ResultStore(part[1])
+        fd = None
+        try:
+            for shard, offset, length in part[2]:
+                if fd is None:
+                    fd = os.open(os.path.join(part[1], shard), os.O_RDONLY)
+                yield json.loads(store.decompress(shard, os.pread(fd, length, offset)))
+        finally:
+            if fd is not None:
+                os.close(fd)
+        return
+
+    # the lines that start in [start, end)
+    _, path, start, end = part
+    with open(path, 'rb') as f:
+        if start:
+            # finishes the line the previous part owns
+            f.seek(start - 1)
+            f.readline()
+        while f.tell() < end:
+            line = f.readline()
+            if not line:
+                break
+            if line.strip():
+                yield json.loads(line)
+
+class ParallelIngest():
+
+    def __init__(self, newOutput, workers=None, writers=1, batchSize=500, queueSize=8, force=False):
+        # newOutput() gives a ProcessOutput for each writer (its own store connection)
+        self.newOutput = newOutput
+        self.workers = workers or os.cpu_count() or 1
+        self.writers = writers
+        self.batchSize = batchSize
+        self.queueSize = queueSize
+        self.force = force
+        self.lock = threading.Lock()
+        self.parsed = self.ingested = self.skipped = self.batches = 0
+        self.partsDone = self.partsTotal = 0
+        self.queues = []
+
+    def run(self, paths, progress=True):
+        started = time.perf_counter()
+        outputs = [self.newOutput() for _ in range(self.writers)]
+        for output in outputs[1:]:
+            output.graphLock = outputs[0].graphLock
+
+        # unchanged files cost a single lookup, as with ingestOutput
+        files = {}
+        todo = []
+        for path in paths:
+            if ResultStore.isStore(path):
+                todo.append(path)
+                continue
+            fileHash = outputs[0].fileHash(path)
+            if not self.force and outputs[0].store.hasLedgerEntry('file_' + fileHash):
+                print(f"📝 {path} was already ingested, skipping it", file=sys.stderr)
+                continue
+            files[path] = fileHash
+            todo.append(path)
+
+        parts = planParts(todo)
+        self.partsTotal = len(parts)
+        self.queues = [queue.Queue(maxsize=self.queueSize) for _ in outputs]
+        errors = []
+        writers = [threading.Thread(target=self.write, args=(output, q, errors), daemon=True)
+                   for output, q in zip(outputs, self.queues)]
+        for writer in writers:
+            writer.start()
+
+        done = threading.Event()
+        if progress:
+            threading.Thread(target=self.showProgress, args=(started, done), daemon=True).start()
+        try:
+            self.feed(parts, errors)
+        finally:
+            for q in self.queues:
+                q.put(None)
+            for writer in writers:
+                writer.join()
+            done.set()
+        elapsed = time.perf_counter() - started
+        if progress:
+            self.printProgress(elapsed, end='\n')
+        if errors:
+            raise errors[0]
+
+        if files:
+            outputs[0].store.putLedgerEntries([{
+                '_key': 'file_' + fileHash,
+                'kind': 'file',
+                'source': path,
+                'ingested_at': datetime.now(timezone.utc).isoformat()
+            } for path, fileHash in files.items()])
+
+        return {'files': len(todo), 'parts': len(parts), 'documents': self.parsed, 'ingested': self.ingested,
+                'skipped': self.skipped, 'batches': self.batches, 'seconds': elapsed,
+                'workers': self.workers, 'writers': self.writers}
+
+    def feed(self, parts, errors):
+        # a bounded window of parts in the pool, their results handed over in input order
+        pending = deque()
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=quiet) as pool:
+            todo = iter(parts)
+            for part in todo:
+                pending.append(pool.submit(buildPart, part))
+                if len(pending) >= 2 * self.workers:
+                    break
+            try:
+                while pending and not errors:
+                    built = pending.popleft().result()
+                    part = next(todo, None)
+                    if part is not None:
+                        pending.append(pool.submit(buildPart, part))
+                    self.route(built, errors)
+                    with self.lock:
+                        self.partsDone += 1
+                        self.parsed += len(built)
+            finally:
+                for future in pending:
+                    future.cancel()
+
+    def route(self, built, errors):
+        shares = [[] for _ in self.queues]
+        for item in built:
+            shares[zlib.crc32(item[0].encode('utf-8')) % len(shares)].append(item)
+        for q, share in zip(self.queues, shares):
+            while share and not errors:
+                # blocks while the writer is behind, which holds back the pool
+                try:
+                    q.put(share, timeout=1)
+                    break
+                except queue.Full:
+                    continue
+
+    def write(self, output, q, errors):
+        batch = []
+        while True:
+            share = q.get()
+            if share is None:
+                break
+            if errors:
+                continue  # drained until the end, so the feeder never blocks on a dead writer
+            batch.extend(share)
+            while len(batch) >= self.batchSize:
+                self.store(output, batch[:self.batchSize], errors)
+                batch = batch[self.batchSize:]
+        if batch and not errors:
+            self.store(output, batch, errors)
+
+    def store(self, output, batch, errors):
+        try:
+            graphs = output.ingestBuilt(batch, self.batchSize, self.force)
+        except Exception as e:
+            errors.append(e)
+            return
+        metrics.count('documents_ingested_total', len(graphs))
+        metrics.count('documents_skipped_total', len(batch) - len(graphs))
+        with self.lock:
+            self.ingested += len(graphs)
+            self.skipped += len(batch) - len(graphs)
+            self.batches += 1
+
+    def showProgress(self, started, done):
+        while not done.wait(0.5):
+            self.printProgress(time.perf_counter() - started)
+
+    def printProgress(self, elapsed, end=''):
+        with self.lock:
+            written = self.ingested + self.skipped
+            line = (f"\rparts {self.partsDone}/{self.partsTotal}, {self.parsed} parsed, {written} written "
+                    f"({self.skipped} unchanged), {written / elapsed if elapsed else 0:.0f} docs/sec, "
+                    f"queued {sum(q.qsize() for q in self.queues)}")
+        print(line, end=end, file=sys.stderr, flush=True)
@@ -1,184 +1,263 @@
-import os, pprint, json
-from random import randrange
+import os, pprint, json, hashlib, threading
 from datetime import datetime, timezone
-from random import randrange
-from arango import ArangoClient
-from arango.exceptions import DatabaseCreateError, CollectionCreateError
 from dotenv import load_dotenv
+from graph_builder import GraphBuilder, known_classes
+import graph_queries
+from metrics import metrics
 
 load_dotenv()
-known_classes = ["medication", "diagnosis", "condition", "treatment"]
 
 class ProcessOutput():
-    def __init__(self):
-        try:
-            self.arango_client = ArangoClient(hosts=os.getenv('ARANGO_HOST'))
-            self.sys_db = self.arango_client.db('_system', username=os.getenv('ARANGO_USER'), password=os.getenv('ARANGO_PASSWORD'))
-        except Exception as e:
-            print(f"❌ Failed to initialize ArangoDB client: {e}")
-            self.arango_client = None
-
-        # Create or connect to test database
-        try:
-            self.sys_db.create_database(os.getenv('ARANGO_DB_NAME'))
-        except DatabaseCreateError:
-            print(f"📝 Database {os.getenv('ARANGO_DB_NAME')} already exists")
-    
-        self.db = self.arango_client.db(os.getenv('ARANGO_DB_NAME'), username=os.getenv('ARANGO_USER'), password=os.getenv('ARANGO_PASSWORD'))
-
-        # Create collections in the database
-        collections_to_create = [
-            ('documents', False),  # Document collection
-            ('entities', False),   # Another document collection
-            ('relationships', True)  # Edge collection for relationships
-        ]
-        for coll_name, is_edge in collections_to_create:
+    def __init__(self, dbName=None, store=None):
+        # everything is written through a storage backend (see storage/), ArangoDB by default
+        if store is None:
+            from storage.arango_store import ArangoStore
             try:
-                self.db.create_collection(coll_name, edge=is_edge)
-            except CollectionCreateError:
-                print(f"📝 Collection {coll_name} already exists")
+                store = ArangoStore(dbName)
+            except Exception as e:
+                print(f"❌ Failed to initialize ArangoDB client: {e}")
+                raise
+        self.store = store
+        # entities and relationships are shared between documents: writers given the same
+        # lock (see parallel_ingest.py) take turns on them instead of conflicting in the database
+        self.graphLock = threading.Lock()
 
         print(f"DB ready to receive data...")
 
-    def ingestOutput(self, fileJsonl):
-        # array to store the outcome
+    def ingestOutput(self, fileJsonl, batchSize=None, keepOutcome=False, force=False):
+        # The file is streamed line by line and, with a batchSize, stored in chunks of that
+        # many documents, so memory does not grow with the file size.
+        # The ingestion ledger skips files and documents already ingested with the same content,
+        # and replaces (instead of adding to) documents whose content changed. force=True
+        # re-ingests everything.
+        # Returns the number of documents ingested, or the graph_data of every document
+        # if the caller asks for it with keepOutcome (that list does grow with the file).
         outcome = []
+        ingested, skipped = 0, 0
 
-        # convert fileJsonl to dictionary
-        dict_file = self.load_jsonl_as_dicts(fileJsonl)
+        # an unchanged file costs a single lookup
+        fileHash = self.fileHash(fileJsonl)
+        if not force and self.store.hasLedgerEntry('file_' + fileHash):
+            print(f"📝 {fileJsonl} was already ingested, skipping it")
+            return outcome if keepOutcome else ingested
 
-        for line in dict_file:
-            graph_data = {
-                'document': {
-                    '_key': "",
-                    'content': "",
-                    'analyzed_at': datetime.now(timezone.utc).isoformat(),
-                    'source': ''
-                },
-                'entities': [],
-                'relationships': []
-            }
-            # add document to graph
-            graph_data['document']['_key'] = line['document_id']
-            graph_data['document']['content'] = line['text']
+        outcome, ingested, skipped = self.ingestDocuments(self.iterate_jsonl(fileJsonl), fileJsonl, batchSize, force, keepOutcome)
 
-            print(f"processing document {graph_data['document']['_key']}")
+        self.store.putLedgerEntries([{
+            '_key': 'file_' + fileHash,
+            'kind': 'file',
+            'source': fileJsonl,
+            'documents': ingested + skipped,
+            'ingested_at': datetime.now(timezone.utc).isoformat()
+        }])
+        print(f"ingested {ingested} documents, {skipped} unchanged skipped")
 
-            # add entities related back to the document
-            for extraction in line['extractions']:
-                graph_data = self.addEntityToGraph(extraction, graph_data)
+        return outcome if keepOutcome else ingested
 
-                # we now can create relationships between entities
-                if extraction['extraction_class'] == 'relationship':
-                    graph_data = self.addRelationshipsToGraph(extraction, graph_data) 
+    def ingestDocuments(self, lines, source, batchSize=None, force=False, keepOutcome=False):
+        # Ingests annotated documents from any iterable (a file, a ResultStore...).
+        # With a batchSize, documents, entities and relationships of many lines
+        # are accumulated and stored with one statement per collection.
+        # Returns (graph_data of each document if keepOutcome, documents ingested, unchanged skipped)
+        outcome = []
+        ingested, skipped = 0, 0
+        chunk = []
+        for line in lines:
+            chunk.append(line)
+            if len(chunk) < (batchSize or 1):
+                continue
+            graphs = self.ingestChunk(chunk, source, batchSize, force)
+            ingested, skipped = ingested + len(graphs), skipped + len(chunk) - len(graphs)
+            if keepOutcome:
+                outcome.extend(graphs)
+            chunk = []
+
+        if chunk:
+            graphs = self.ingestChunk(chunk, source, batchSize, force)
+            ingested, skipped = ingested + len(graphs), skipped + len(chunk) - len(graphs)
+            if keepOutcome:
+                outcome.extend(graphs)
+
+        metrics.count('documents_ingested_total', ingested)
+        metrics.count('documents_skipped_total', skipped)
+        return outcome, ingested, skipped
+
+    def ingestStore(self, store, batchSize=None, force=False):
+        # every document of a ResultStore (result_store.py), streamed shard by shard.
+        # The ledger skips the documents already ingested unchanged
+        print(f"ingesting {len(store)} documents from {store.storeDir}")
+        _, ingested, skipped = self.ingestDocuments(store.iterDocuments(), store.storeDir, batchSize, force)
+        print(f"ingested {ingested} documents, {skipped} unchanged skipped")
+        return ingested
+
+    def ingestChunk(self, lines, source, batchSize, force):
+        items = [(line['document_id'], self.documentHash(line), line, source) for line in lines]
+        return self.ingestItems(items, batchSize, force, self.buildGraphData)
+
+    def ingestBuilt(self, built, batchSize, force):
+        # (document_id, hash, graph_data, source) already built elsewhere, ie. by the
+        # worker processes of parallel_ingest.py
+        return self.ingestItems(built, batchSize, force, lambda graph_data: graph_data)
+
+    def ingestItems(self, items, batchSize, force, build):
+        # items are (document_id, hash, document, source), build turns a document into
+        # its graph_data once the ledger says it has to be stored
+        known = {entry['_key']: entry for entry in self.store.getLedgerEntries([item[0] for item in items])}
+
+        graphs = {}
+        hashes = {}
+        sources = {}
+        changed = []
+        for document_id, documentHash, document, source in items:
+            if document_id in known:
+                if not force and known[document_id]['hash'] == documentHash:
+                    continue
+                if document_id not in graphs:
+                    changed.append(known.pop(document_id))
+            # the same document twice in a chunk: the last one wins
+            graphs[document_id] = build(document)
+            hashes[document_id], sources[document_id] = documentHash, source
+        graphs = list(graphs.values())
+
+        # what the previous version of the changed documents added is taken back first
+        if changed:
+            with self.graphLock:
+                self.retractDocuments(changed)
+
+        if not graphs:
+            return graphs
+        if batchSize:
+            self.storeGraphBatch(graphs)
+        else:
+            for graph_data in graphs:
+                self.storeGraph(graph_data)
+
+        self.store.putLedgerEntries([self.ledgerEntry(graph_data, hashes[graph_data['document']['_key']],
+                                                      sources[graph_data['document']['_key']])
+                                     for graph_data in graphs])
+        return graphs
+
+    def retractDocuments(self, entries):
+        # takes back what the previous version of these documents added
+        print(f"replacing {len(entries)} changed documents")
+
+        mentions = [key for entry in entries for key in entry.get('mentions', [])]
+        associations = {}
+        for entry in entries:
+            for item in entry.get('associations', []):
+                associations[item['key']] = associations.get(item['key'], 0) + item['count']
+        associations = [{'key': key, 'count': count} for key, count in associations.items()]
 
-            outcome.append(graph_data)
+        self.store.retractDocuments([entry['_key'] for entry in entries], mentions, associations)
 
-            #  Store the graph
+        # taken back once only: until the new version is stored, the ledger says there is
+        # nothing left to retract, so a batch that failed after this point can be ingested again
+        self.store.putLedgerEntries([{
+            '_key': entry['_key'],
+            'kind': 'document',
+            'hash': None,
+            'source': entry.get('source'),
+            'retracted_at': datetime.now(timezone.utc).isoformat(),
+            'associations': [],
+            'mentions': []
+        } for entry in entries])
 
-            ## Store the document (safe if processed twice)
-            self.db.collection('documents').insert(graph_data['document'], overwrite=True)
+        # the ledger doesn't know every entity the old versions pointed at, drop all cached queries
+        graph_queries.resultCache.clear()
 
+    def ledgerEntry(self, graph_data, documentHash, source):
+        # enough to take the document back if it changes: its entity <-> entity edges
+        # (with how many times it added them) and its own entities
+        associations = {}
+        for relationship in graph_data['relationships']:
+            if relationship['relationship_type'] == 'associated':
+                associations[relationship['_key']] = associations.get(relationship['_key'], 0) + 1
+        return {
+            '_key': graph_data['document']['_key'],
+            'kind': 'document',
+            'hash': documentHash,
+            'source': source,
+            'ingested_at': datetime.now(timezone.utc).isoformat(),
+            'associations': [{'key': key, 'count': count} for key, count in associations.items()],
+            'mentions': [entity['_key'] for entity in graph_data['entities'] if entity['extraction_class'] not in known_classes]
+        }
+
+    @staticmethod
+    def documentHash(line):
+        return hashlib.sha256(json.dumps(line, sort_keys=True).encode('utf-8')).hexdigest()
+
+    def fileHash(self, file_path):
+        digest = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(block)
+        return digest.hexdigest()
+
+    @staticmethod
+    def buildGraphData(line):
+        return GraphBuilder.fromAnnotatedDocument(line).graphData()
+
+    def storeGraph(self, graph_data):
+        self.storeGraphBatch([graph_data])
+
+    def storeGraphBatch(self, graphs):
+        # One call per collection for the whole batch. A single UPSERT statement can't see
+        # its own writes, so repeated keys are merged here first.
+        if len(graphs) > 1:
+            print(f"storing a batch of {len(graphs)} documents")
+
+        documents = {}
+        entities = {}
+        keyed_relationships = {}
+        relationships = []
+        for graph_data in graphs:
+            # last write wins, as with insert(overwrite=True)
+            documents[graph_data['document']['_key']] = graph_data['document']
+
+            # UPDATE merges attributes into the stored entity
+            for entity in graph_data['entities']:
+                entities.setdefault(entity['_key'], {}).update(entity)
+
+            # the first occurrence is inserted, the following ones only increase the count
+            for relationship in graph_data['relationships']:
+                if relationship.get('_key') is None:
+                    relationships.append({'relationship': relationship, 'count': 1})
+                elif relationship['_key'] in keyed_relationships:
+                    keyed_relationships[relationship['_key']]['count'] += 1
+                else:
+                    keyed_relationships[relationship['_key']] = {'relationship': relationship, 'count': 1}
+        relationships.extend(keyed_relationships.values())
+
+        ## Store the documents (safe if processed twice)
+        self.store.storeDocuments(list(documents.values()))
+        metrics.count('entities_written_total', len(entities))
+        metrics.count('edges_written_total', len(relationships))
+
+        with self.graphLock:
             ## Store the entities (safe if already exist in the db)
-            if(graph_data['entities']):
-                aql = '''
-                FOR entity IN @entities
-                    UPSERT { _key: entity._key }
-                    INSERT entity
-                    UPDATE entity
-                    IN entities
-                '''
-                self.db.aql.execute(aql, bind_vars={'entities': graph_data['entities']})
+            if(entities):
+                self.store.upsertEntities(list(entities.values()))
 
             ## Store the relationships (safe if already exist in the db)
-            if(graph_data['relationships']):
-                aql = '''
-                FOR relationship IN @relationships
-                    UPSERT {_key: relationship._key }
-                    INSERT MERGE (relationship, {count: 1})
-                    UPDATE ({ count: OLD.count + 1 })
-                    IN relationships
-                '''
-                self.db.aql.execute(aql, bind_vars={'relationships': graph_data['relationships']})
-            
-        return outcome
-
-    def addEntityToGraph(self, extraction, graph_data):
-        if extraction['extraction_class'] == 'relationship':
-            # this is a relationship not an entity. Do nothing.
-            return graph_data
-        
-        if extraction['extraction_class'] in known_classes:
-            # if the class is known (ie. "medication", "diagnosis", "condition", "treatment") the key is the extraction_text
-            extraction['_key'] = extraction["extraction_text"].lower().replace(" ","_")
-            
-        else:
-            # otherwise, it's a unique entity (ie symptoms, other)
-            # TODO do demographics
-            extraction['_key'] = extraction["extraction_class"]+"_"+str(randrange(0,9999))        
-            
-        if any(entity['_key'] == extraction['_key'] for entity in graph_data['entities']):
-            print(f"found entity {extraction['_key']} duplicated, skipping insertion of entity")
-            return graph_data
-
-        print(f"inserting entity {extraction['_key']} with rel to document {graph_data['document']['_key']}")
-
-        # Insert relationship entity - document
-        ent_rel_doc = {
-                        '_from': f"documents/{graph_data['document']['_key']}",
-                        '_to': f"entities/{extraction['_key']}",
-                        'relationship_type': 'extraction',
-                        'char_interval': extraction['char_interval'],
-                        'alignment_status':  extraction['alignment_status'],
-                        'confidence': self.confidenceFromAlignment(extraction['alignment_status'])
-                    }
-        graph_data['entities'].append(extraction)
-        graph_data['relationships'].append(ent_rel_doc)
-        return graph_data
-
-    def addRelationshipsToGraph(self, extraction, graph_data):    
-        # link the entities among themselves
-        if extraction['extraction_class'] != 'relationship':
-            print("this extraction is not a relationship")
-            return graph_data
-
-        entity1_key = extraction['attributes']['entity_1'].lower().replace(" ","_")
-        entity2_key = extraction['attributes']['entity_2'].lower().replace(" ","_")
-
-        # Create order-independent key (alphabetical sorting)
-        sorted_entities = sorted([entity1_key, entity2_key])
-        relationship_key = f"{sorted_entities[0]}_assoc_{sorted_entities[1]}"
-
-        print(f"creating relationship between {entity1_key} and {entity2_key}")
-
-        # Insert relationship entity - entity
-        ent_rel_ent = {
-                        '_key': relationship_key,
-                        '_from': f"entities/{entity1_key}",
-                        '_to': f"entities/{entity2_key}",
-                        'relationship_type': 'associated',
-                        'alignment_status':  extraction['alignment_status'],
-                        'confidence': self.confidenceFromAlignment(extraction['alignment_status'])
-                    }
-        graph_data['relationships'].append(ent_rel_ent)
-        return graph_data
+            if(relationships):
+                self.store.upsertRelationships(relationships)
+
+        # cached query results about these entities may have changed
+        touched = {f"entities/{key}" for key in entities}
+        for item in relationships:
+            touched.add(item['relationship']['_from'])
+            touched.add(item['relationship']['_to'])
+        graph_queries.invalidate(touched)
+
+    def compactExtractionEdges(self, batchSize=1000):
+        return self.store.compactExtractionEdges(batchSize)
 
     def load_jsonl_as_dicts(self, file_path):
-        data = []
+        return list(self.iterate_jsonl(file_path))
+
+    def iterate_jsonl(self, file_path):
+        # one parsed line at a time, the file is never fully in memory
         with open(file_path, 'r') as f:
             for line in f:
                 if line.strip():  # Skip empty lines
-                    data.append(json.loads(line.strip()))
-        
-        return data
-
-    def confidenceFromAlignment(self, alignment_status):
-        match alignment_status:
-            case 'match_exact':
-                return 1
-            case 'match_fuzzy':
-                return 0.6
-            case 'match_lesser':
-                return 0.3
-            case _:
-                return 0
\ No newline at end of file
+                    yield json.loads(line)
@@ -0,0 +1,146 @@
+import fcntl, gzip, json, os
+
+# Append-only store of annotated documents (the lines LangExtractor.saveResults writes), in
+# place of one small JSONL file per record. Documents go into compressed shards
+# (shard-00000.jsonl.gz, rotated at maxShardBytes), each one as its own gzip member (or zstd
+# frame), so it can be read back alone, and a sidecar index.jsonl maps each document_id to
+# (shard, offset, length). A shard is also a valid .jsonl.gz to stream with any tool.
+#
+# Appends take an exclusive flock on the store, so batch workers (threads or processes)
+# can share it. A document appended again supersedes the previous copy in the index.
+
+INDEX = 'index.jsonl'
+LOCK = '.lock'
+
+class ResultStore():
+
+    def __init__(self, storeDir='test_output/results', maxShardBytes=64 * 1024 * 1024, compression='gzip'):
+        if compression not in ('gzip', 'zstd'):
+            raise ValueError(f"compression must be gzip or zstd, not {compression}")
+        self.storeDir = storeDir
+        self.maxShardBytes = maxShardBytes
+        self.compression = compression
+        self.extension = '.jsonl.gz' if compression == 'gzip' else '.jsonl.zst'
+        os.makedirs(storeDir, exist_ok=True)
+        self.entries = {}  # document_id -> latest index entry
+        self.indexOffset = 0  # how much of index.jsonl is loaded
+
+    @staticmethod
+    def isStore(path):
+        return os.path.isdir(path) and os.path.isfile(os.path.join(path, INDEX))
+
+    # --- writing ---
+
+    def append(self, document):
+        # stores one annotated document (a dict with document_id), returns its index entry
+        payload = self.compress((json.dumps(document, ensure_ascii=False) + '\n').encode('utf-8'))
+        with open(os.path.join(self.storeDir, LOCK), 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                shard = self.currentShard(len(payload))
+                with open(os.path.join(self.storeDir, shard), 'ab') as f:
+                    offset = f.seek(0, os.SEEK_END)
+                    f.write(payload)
+                entry = {
+                    'document_id': document['document_id'],
+                    'shard': shard,
+                    'offset': offset,
+                    'length': len(payload),
+                    'extractions': len(document.get('extractions') or []),
+                }
+                with open(os.path.join(self.storeDir, INDEX), 'a') as index:
+                    index.write(json.dumps(entry) + '\n')
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+        self.entries[entry['document_id']] = entry
+        return entry
+
+    def currentShard(self, incoming):
+        # the last shard, or a new one once it would go over maxShardBytes
+        shards = self.shards()
+        if shards:
+            size = os.path.getsize(os.path.join(self.storeDir, shards[-1]))
+            if size == 0 or size + incoming <= self.maxShardBytes:
+                return shards[-1]
+        return f"shard-{len(shards):05d}{self.extension}"
+
+    def compress(self, data):
+        if self.compression == 'gzip':
+            return gzip.compress(data, compresslevel=6, mtime=0)
+        import zstandard
+        return zstandard.ZstdCompressor(level=6).compress(data)
+
+    # --- reading ---
+
+    def shards(self):
+        return sorted(name for name in os.listdir(self.storeDir)
+                      if name.startswith('shard-') and name.endswith(('.jsonl.gz', '.jsonl.zst')))
+
+    def refresh(self):
+        # loads what other writers appended to the index since the last call
+        path = os.path.join(self.storeDir, INDEX)
+        if not os.path.isfile(path):
+            return self
+        with open(path, 'rb') as f:
+            f.seek(self.indexOffset)
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break  # being written, next time
+                self.indexOffset += len(line)
+                entry = json.loads(line)
+                self.entries[entry['document_id']] = entry
+        return self
+
+    def __len__(self):
+        return len(self.refresh().entries)
+
+    def documentIds(self):
+        return list(self.refresh().entries)
+
+    def get(self, document_id):
+        # one document, with a single read of its compressed member
+        entry = self.entries.get(document_id) or self.refresh().entries.get(document_id)
+        if entry is None:
+            raise KeyError(document_id)
+        fd = os.open(os.path.join(self.storeDir, entry['shard']), os.O_RDONLY)
+        try:
+            data = os.pread(fd, entry['length'], entry['offset'])
+        finally:
+            os.close(fd)
+        return json.loads(self.decompress(entry['shard'], data))
+
+    def decompress(self, shard, data):
+        if shard.endswith('.gz'):
+            return gzip.decompress(data)
+        import zstandard
+        return zstandard.ZstdDecompressor().decompress(data)
+
+    def iterDocuments(self, latestOnly=True):
+        # every document in the order they were appended, reading the shards sequentially.
+        # latestOnly skips the copies superseded by a later append
+        self.refresh()
+        shard, f = None, None
+        if not self.indexOffset:
+            return
+        try:
+            with open(os.path.join(self.storeDir, INDEX), 'rb') as index:
+                read = 0
+                for line in index:
+                    # up to what refresh() saw, later appends are not in self.entries
+                    read += len(line)
+                    if read > self.indexOffset:
+                        break
+                    entry = json.loads(line)
+                    if latestOnly:
+                        latest = self.entries[entry['document_id']]
+                        if (latest['shard'], latest['offset']) != (entry['shard'], entry['offset']):
+                            continue
+                    if entry['shard'] != shard:
+                        if f:
+                            f.close()
+                        shard, f = entry['shard'], open(os.path.join(self.storeDir, entry['shard']), 'rb')
+                    f.seek(entry['offset'])
+                    yield json.loads(self.decompress(shard, f.read(entry['length'])))
+        finally:
+            if f:
+                f.close()
@@ -0,0 +1,154 @@
+import sys
+import arango_session
+from storage.graph_store import GraphStore
+from graph_builder import extractionEdgeKey
+from metrics import metrics
+
+COLLECTIONS = arango_session.GRAPH_COLLECTIONS + [
+    ('ingestion_ledger', False)  # What was ingested, by content hash
+]
+
+# persistent indexes for the fields we query by (besides _key, and _from/_to on edges)
+INDEXES = {
+    'entities': [['extraction_class'], ['extraction_text']],
+    'relationships': [['relationship_type'], ['confidence'], ['alignment_status']],
+}
+
+class ArangoStore(GraphStore):
+    # The graph in ArangoDB, one statement per collection and call
+
+    def __init__(self, dbName=None):
+        # the database, collections and indexes are checked once per process, and every
+        # ArangoStore shares the same connection pool
+        self.db = arango_session.getDatabase(dbName, COLLECTIONS, INDEXES)
+
+    def storeDocuments(self, documents):
+        metrics.count('db_round_trips_total', operation='storeDocuments')
+        results = self.db.collection('documents').insert_many(documents, overwrite=True)
+        # insert_many returns the errors instead of raising. They are raised like insert()
+        # did, so the batch is neither linked to entities nor written to the ledger
+        errors = [result for result in results if isinstance(result, Exception)]
+        for error in errors:
+            print(f"❌ Failed to store document: {error}", file=sys.stderr)
+        if errors:
+            raise errors[0]
+
+    def upsertEntities(self, entities):
+        aql = '''
+        FOR entity IN @entities
+            UPSERT { _key: entity._key }
+            INSERT entity
+            UPDATE entity
+            IN entities
+        '''
+        metrics.count('db_round_trips_total', operation='upsertEntities')
+        self.db.aql.execute(aql, bind_vars={'entities': entities})
+
+    def upsertRelationships(self, items):
+        aql = '''
+        FOR item IN @relationships
+            UPSERT {_key: item.relationship._key }
+            INSERT MERGE (item.relationship, {count: item.count})
+            UPDATE ({ count: OLD.count + item.count })
+            IN relationships
+        '''
+        metrics.count('db_round_trips_total', operation='upsertRelationships')
+        self.db.aql.execute(aql, bind_vars={'relationships': items})
+
+    def retractDocuments(self, document_keys, mentions, associations):
+        # document -> entity edges
+        aql = '''
+        FOR document IN @documents
+            FOR edge IN relationships
+                FILTER edge._from == document AND edge.relationship_type == 'extraction'
+                REMOVE edge IN relationships
+        '''
+        metrics.count('db_round_trips_total', operation='retractDocuments')
+        self.db.aql.execute(aql, bind_vars={'documents': [f"documents/{key}" for key in document_keys]})
+
+        # entities that only existed in those documents
+        if mentions:
+            aql = '''
+            FOR key IN @mentions
+                REMOVE key IN entities OPTIONS { ignoreErrors: true }
+            '''
+            metrics.count('db_round_trips_total', operation='retractDocuments')
+            self.db.aql.execute(aql, bind_vars={'mentions': mentions})
+
+        # their share of the entity <-> entity counts
+        if associations:
+            aql = '''
+            FOR item IN @associations
+                LET edge = DOCUMENT('relationships', item.key)
+                FILTER edge != null
+                UPDATE edge WITH { count: edge.count - item.count } IN relationships
+            '''
+            metrics.count('db_round_trips_total', operation='retractDocuments')
+            self.db.aql.execute(aql, bind_vars={'associations': associations})
+            aql = '''
+            FOR item IN @associations
+                LET edge = DOCUMENT('relationships', item.key)
+                FILTER edge != null AND edge.count <= 0
+                REMOVE edge IN relationships
+            '''
+            metrics.count('db_round_trips_total', operation='retractDocuments')
+            self.db.aql.execute(aql, bind_vars={'associations': associations})
+
+    def hasLedgerEntry(self, key):
+        metrics.count('db_round_trips_total', operation='hasLedgerEntry')
+        return self.db.collection('ingestion_ledger').has(key)
+
+    def getLedgerEntries(self, keys):
+        metrics.count('db_round_trips_total', operation='getLedgerEntries')
+        return self.db.collection('ingestion_ledger').get_many(keys)
+
+    def putLedgerEntries(self, entries):
+        metrics.count('db_round_trips_total', operation='putLedgerEntries')
+        self.db.collection('ingestion_ledger').insert_many(entries, overwrite=True)
+
+    def counts(self):
+        return {name: self.db.collection(name).count() for name in ['documents', 'entities', 'relationships']}
+
+    def compactExtractionEdges(self, batchSize=1000):
+        # One-off clean up of the document -> entity edges stored before they had a stable key:
+        # each (document, entity) pair is collapsed into a single edge with its stable key
+        # (computed here, AQL has no sha256).
+        aql = '''
+        FOR edge IN relationships
+            FILTER edge.relationship_type == 'extraction'
+            COLLECT fromId = edge._from, toId = edge._to INTO duplicates = edge
+            RETURN { edge: FIRST(duplicates), keys: duplicates[*]._key }
+        '''
+        relationships = self.db.collection('relationships')
+        cursor = self.db.aql.execute(aql, batch_size=batchSize, stream=True)
+
+        pairs, removed = 0, 0
+        inserts, deletes = [], []
+        for group in cursor:
+            edge = group['edge']
+            stable_key = extractionEdgeKey(edge['_from'].split('/', 1)[1], edge['_to'].split('/', 1)[1])
+            if group['keys'] == [stable_key]:
+                continue
+
+            pairs += 1
+            compacted = {name: value for name, value in edge.items() if name not in ('_id', '_rev')}
+            compacted['_key'] = stable_key
+            compacted['count'] = 1
+            inserts.append(compacted)
+            deletes.extend(key for key in group['keys'] if key != stable_key)
+
+            if len(inserts) >= batchSize or len(deletes) >= batchSize:
+                removed += self.flushCompaction(relationships, inserts, deletes)
+                inserts, deletes = [], []
+
+        removed += self.flushCompaction(relationships, inserts, deletes)
+        print(f"✅ compacted {pairs} document-entity pairs, {removed} duplicated edges removed")
+        return removed
+
+    def flushCompaction(self, relationships, inserts, deletes):
+        # insert the compacted edges first, a failure halfway never loses a pair
+        if inserts:
+            relationships.insert_many(inserts, overwrite=True)
+        if deletes:
+            relationships.delete_many([{'_key': key} for key in deletes])
+        return len(deletes)
@@ -0,0 +1,34 @@
+class GraphStore():
+    # What ProcessOutput writes through. A backend keeps three collections (documents,
+    # entities and relationships, the edges) plus the ingestion ledger, with these semantics:
+    #   - documents are overwritten
+    #   - entities are upserted by _key, merging the new attributes into the stored ones
+    #   - relationships are upserted by _key: inserted with `count`, or their count increased
+
+    def storeDocuments(self, documents):
+        raise NotImplementedError
+
+    def upsertEntities(self, entities):
+        raise NotImplementedError
+
+    def upsertRelationships(self, items):
+        # items are {'relationship': edge, 'count': n}, with no repeated keys
+        raise NotImplementedError
+
+    def retractDocuments(self, document_keys, mentions, associations):
+        # removes the document -> entity edges of those documents and the `mentions` entities,
+        # and takes {'key', 'count'} `associations` off the entity <-> entity edge counts
+        raise NotImplementedError
+
+    def hasLedgerEntry(self, key):
+        raise NotImplementedError
+
+    def getLedgerEntries(self, keys):
+        raise NotImplementedError
+
+    def putLedgerEntries(self, entries):
+        raise NotImplementedError
+
+    def counts(self):
+        # {'documents': n, 'entities': n, 'relationships': n}
+        raise NotImplementedError
@@ -0,0 +1,210 @@
+import os, pickle
+from array import array
+from storage.graph_store import GraphStore
+
+class MemoryGraphStore(GraphStore):
+    # In-process graph with the same upsert/count semantics as ArangoStore.
+    # Vertex ids ('documents/x', 'entities/y') are interned to ints, and edges live in
+    # parallel int arrays (source, target, count, alive). Adjacency is a CSR built on demand:
+    # offsets[v]..offsets[v+1] index into an array of edge positions sorted by vertex.
+
+    def __init__(self):
+        self.documents = {}
+        self.entities = {}
+        self.ledger = {}
+
+        self.vertexIds = {}
+        self.vertexNames = []
+
+        self.edgeSource = array('i')
+        self.edgeTarget = array('i')
+        self.edgeCount = array('q')
+        self.edgeAlive = array('b')
+        self.edgeData = []  # the other attributes of each edge, _key included
+        self.edgePositions = {}  # _key -> position in the arrays
+        self.removedEdges = 0
+        self.nextEdge = 0  # for the edges without a _key, never reused (compact() moves positions)
+
+        self.csr = None
+
+    def intern(self, vertex):
+        vertex_id = self.vertexIds.get(vertex)
+        if vertex_id is None:
+            vertex_id = self.vertexIds[vertex] = len(self.vertexNames)
+            self.vertexNames.append(vertex)
+        return vertex_id
+
+    def storeDocuments(self, documents):
+        for document in documents:
+            self.documents[document['_key']] = dict(document)
+
+    def upsertEntities(self, entities):
+        for entity in entities:
+            self.entities.setdefault(entity['_key'], {}).update(entity)
+
+    def upsertRelationships(self, items):
+        for item in items:
+            relationship = item['relationship']
+            key = relationship.get('_key') or self.newEdgeKey()
+            position = self.edgePositions.get(key)
+            if position is not None:
+                self.edgeCount[position] += item['count']
+                continue
+
+            self.edgePositions[key] = len(self.edgeData)
+            self.edgeSource.append(self.intern(relationship['_from']))
+            self.edgeTarget.append(self.intern(relationship['_to']))
+            self.edgeCount.append(item['count'])
+            self.edgeAlive.append(1)
+            data = {name: value for name, value in relationship.items() if name not in ('_from', '_to', 'count')}
+            data['_key'] = key
+            self.edgeData.append(data)
+            self.csr = None
+
+    def newEdgeKey(self):
+        key = f"edge_{self.nextEdge}"
+        while key in self.edgePositions:
+            self.nextEdge += 1
+            key = f"edge_{self.nextEdge}"
+        self.nextEdge += 1
+        return key
+
+    def removeEdge(self, position):
+        self.edgeAlive[position] = 0
+        del self.edgePositions[self.edgeData[position]['_key']]
+        self.removedEdges += 1
+        self.csr = None
+
+    def retractDocuments(self, document_keys, mentions, associations):
+        # the edges of every document are found with the same CSR, then removed
+        # (removing one drops the CSR)
+        positions = [position for key in document_keys for position in self.edgesOf(f"documents/{key}", 'outbound')
+                     if self.edgeData[position].get('relationship_type') == 'extraction']
+        for position in positions:
+            self.removeEdge(position)
+
+        for key in mentions:
+            self.entities.pop(key, None)
+
+        for item in associations:
+            position = self.edgePositions.get(item['key'])
+            if position is None:
+                continue
+            self.edgeCount[position] -= item['count']
+            if self.edgeCount[position] <= 0:
+                self.removeEdge(position)
+
+        if self.removedEdges > len(self.edgePositions):
+            self.compact()
+
+    def hasLedgerEntry(self, key):
+        return key in self.ledger
+
+    def getLedgerEntries(self, keys):
+        return [self.ledger[key] for key in keys if key in self.ledger]
+
+    def putLedgerEntries(self, entries):
+        for entry in entries:
+            self.ledger[entry['_key']] = entry
+
+    def counts(self):
+        return {'documents': len(self.documents), 'entities': len(self.entities), 'relationships': len(self.edgePositions)}
+
+    # --- adjacency ---
+
+    def buildCSR(self):
+        vertices = len(self.vertexNames)
+        csr = {}
+        for direction, ends in (('outbound', self.edgeSource), ('inbound', self.edgeTarget)):
+            offsets = array('i', bytes(array('i').itemsize * (vertices + 1)))
+            for position, vertex_id in enumerate(ends):
+                if self.edgeAlive[position]:
+                    offsets[vertex_id + 1] += 1
+            for vertex_id in range(vertices):
+                offsets[vertex_id + 1] += offsets[vertex_id]
+            positions = array('i', bytes(array('i').itemsize * offsets[vertices]))
+            cursor = array('i', offsets)
+            for position, vertex_id in enumerate(ends):
+                if self.edgeAlive[position]:
+                    positions[cursor[vertex_id]] = position
+                    cursor[vertex_id] += 1
+            csr[direction] = (offsets, positions)
+        self.csr = csr
+
+    def edgesOf(self, vertex, direction='outbound'):
+        # positions of the edges leaving (outbound) or reaching (inbound) a vertex
+        vertex_id = self.vertexIds.get(vertex)
+        if vertex_id is None:
+            return []
+        if self.csr is None:
+            self.buildCSR()
+        offsets, positions = self.csr[direction]
+        return positions[offsets[vertex_id]:offsets[vertex_id + 1]].tolist()
+
+    def neighbors(self, vertex, direction='any'):
+        # [(neighbor vertex, edge)] with edges as ArangoDB would return them
+        directions = ['outbound', 'inbound'] if direction == 'any' else [direction]
+        result = []
+        for way in directions:
+            ends = self.edgeTarget if way == 'outbound' else self.edgeSource
+            for position in self.edgesOf(vertex, way):
+                result.append((self.vertexNames[ends[position]], self.edge(position)))
+        return result
+
+    def edge(self, position):
+        edge = dict(self.edgeData[position])
+        edge['_from'] = self.vertexNames[self.edgeSource[position]]
+        edge['_to'] = self.vertexNames[self.edgeTarget[position]]
+        edge['count'] = self.edgeCount[position]
+        return edge
+
+    def compact(self):
+        # drop the removed edges from the arrays
+        alive = [position for position in range(len(self.edgeData)) if self.edgeAlive[position]]
+        self.edgeSource = array('i', (self.edgeSource[position] for position in alive))
+        self.edgeTarget = array('i', (self.edgeTarget[position] for position in alive))
+        self.edgeCount = array('q', (self.edgeCount[position] for position in alive))
+        self.edgeAlive = array('b', [1]) * len(alive)
+        self.edgeData = [self.edgeData[position] for position in alive]
+        self.edgePositions = {data['_key']: position for position, data in enumerate(self.edgeData)}
+        self.removedEdges = 0
+        self.csr = None
+
+    # --- snapshots ---
+
+    def snapshot(self, path):
+        self.compact()
+        state = {
+            'documents': self.documents,
+            'entities': self.entities,
+            'ledger': self.ledger,
+            'vertexNames': self.vertexNames,
+            'edgeSource': self.edgeSource,
+            'edgeTarget': self.edgeTarget,
+            'edgeCount': self.edgeCount,
+            'edgeData': self.edgeData,
+            'nextEdge': self.nextEdge,
+        }
+        with open(path + '.tmp', 'wb') as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(path + '.tmp', path)
+        print(f"✅ graph snapshot saved to {path}")
+
+    @classmethod
+    def load(cls, path):
+        store = cls()
+        with open(path, 'rb') as f:
+            state = pickle.load(f)
+        store.documents = state['documents']
+        store.entities = state['entities']
+        store.ledger = state['ledger']
+        store.vertexNames = state['vertexNames']
+        store.vertexIds = {vertex: vertex_id for vertex_id, vertex in enumerate(store.vertexNames)}
+        store.edgeSource = state['edgeSource']
+        store.edgeTarget = state['edgeTarget']
+        store.edgeCount = state['edgeCount']
+        store.edgeAlive = array('b', [1]) * len(state['edgeData'])
+        store.edgeData = state['edgeData']
+        store.edgePositions = {data['_key']: position for position, data in enumerate(store.edgeData)}
+        store.nextEdge = state.get('nextEdge', len(store.edgeData))
+        return store
@@ -0,0 +1,41 @@
+import arango_session
+
+class FakeCollection():
+    def __init__(self, indexes, count):
+        self.existing, self.documents = indexes, count
+        self.listings, self.added = 0, []
+
+    def indexes(self):
+        self.listings += 1
+        return self.existing
+
+    def count(self):
+        return self.documents
+
+    def add_index(self, data, formatter=False):
+        self.added.append(data)
+        return {'isNewlyCreated': True, 'fields': data['fields']}
+
+class FakeDatabase():
+    def __init__(self, collections):
+        self.collections = collections
+
+    def collection(self, name):
+        return self.collections[name]
+
+def test_only_missing_indexes_are_created_once_per_process(capsys):
+    entities = FakeCollection([{'type': 'primary', 'fields': ['_key']},
+                               {'type': 'persistent', 'fields': ['extraction_class']}], 10)
+    relationships = FakeCollection([], 0)
+    db = FakeDatabase({'entities': entities, 'relationships': relationships})
+    indexes = {'entities': [['extraction_class'], ['extraction_text']], 'relationships': [['relationship_type']]}
+    arango_session.forgetDatabase('fake')
+
+    arango_session.ensureIndexes(db, 'fake', indexes)
+    arango_session.ensureIndexes(db, 'fake', indexes)
+
+    assert [index['fields'] for index in entities.added] == [['extraction_text']]
+    # built in the background where there is data already
+    assert entities.added[0]['inBackground'] and not relationships.added[0]['inBackground']
+    assert entities.listings == relationships.listings == 1
+    assert 'Created index on entities' in capsys.readouterr().out
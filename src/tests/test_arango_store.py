@@ -0,0 +1,46 @@
+import pytest
+from storage.memory_store import MemoryGraphStore
+from processOutput import ProcessOutput
+from storage.arango_store import ArangoStore
+
+class RejectingCollection():
+    # insert_many answers with an error for the documents it rejects, as python-arango does
+    def __init__(self, rejected):
+        self.rejected = rejected
+
+    def insert_many(self, documents, overwrite=False):
+        return [ValueError(f"rejected {document['_key']}") if document['_key'] in self.rejected else {'_key': document['_key']}
+                for document in documents]
+
+class FakeDatabase():
+    def __init__(self, collection):
+        self.documents = collection
+
+    def collection(self, name):
+        return self.documents
+
+class RejectingStore(MemoryGraphStore):
+    # the in-memory graph, with ArangoStore's document insert
+    def __init__(self, rejected):
+        super().__init__()
+        self.arango = ArangoStore.__new__(ArangoStore)
+        self.arango.db = FakeDatabase(RejectingCollection(rejected))
+
+    def storeDocuments(self, documents):
+        self.arango.storeDocuments(documents)
+        super().storeDocuments(documents)
+
+def annotated(document_id):
+    return {'document_id': document_id, 'text': 'Olanzapine for schizophrenia.', 'extractions': [
+        {'extraction_class': 'medication', 'extraction_text': 'Olanzapine', 'char_interval': None,
+         'alignment_status': 'match_exact', 'attributes': None}]}
+
+def test_a_rejected_document_raises_and_is_not_ledgered():
+    store = RejectingStore({'bad'})
+    output = ProcessOutput(store=store)
+    items = [(document_id, ProcessOutput.documentHash(annotated(document_id)), annotated(document_id), 'test')
+             for document_id in ['good', 'bad']]
+    with pytest.raises(ValueError, match='rejected bad'):
+        output.ingestItems(items, 500, False, ProcessOutput.buildGraphData)
+    assert store.getLedgerEntries(['good', 'bad']) == []
+    assert store.counts()['entities'] == 0
@@ -0,0 +1,58 @@
+import pytest
+from canonicalizer import Canonicalizer, DEFAULT_SYNONYMS
+from graph_builder import GraphBuilder
+
+@pytest.fixture(scope='module')
+def canonicalizer():
+    return Canonicalizer(DEFAULT_SYNONYMS)
+
+@pytest.mark.parametrize('text, canonical', [
+    ('oral cancer', 'oral cancer'),
+    ('Oral candidiasis', 'oral candidiasis'),
+    ('IV drug use', 'iv drug use'),
+    ('ER visit', 'er visit'),
+    ('CR-positive', 'cr-positive'),
+    ("Peyer's patch", 'peyer s patch'),
+    ('Bipolar disorder', 'bipolar affective disorder'),
+    ('Hypothyroïdism', 'hypothyroidism'),
+])
+def test_conditions_keep_dose_form_and_route_words(canonicalizer, text, canonical):
+    assert canonicalizer.canonical(text, 'condition') == canonical
+    assert canonicalizer.canonical(text) == canonical
+
+@pytest.mark.parametrize('text, canonical', [
+    ('Olanzapine 10 mg', 'olanzapine'),
+    ('tab. olanzapine', 'olanzapine'),
+    ('IV cefazolin 1 g', 'cefazolin'),
+    ('Metformin ER 500 mg', 'metformin'),
+    ('nifedipine XR', 'nifedipine'),
+    ('Eltroxin 50 micrograms', 'levothyroxine'),
+    # the micro sign (U+00B5) is Greek mu (U+03BC) once casefolded
+    ('levothyroxine 50 \u00b5g', 'levothyroxine'),
+    ('levothyroxine 50 \u03bcg', 'levothyroxine'),
+    ('lithium carbonate 450 mg per day', 'lithium'),
+    ('10 mg', '10 mg'),
+])
+def test_medications_lose_dose_form_route_and_release(canonicalizer, text, canonical):
+    assert canonicalizer.canonical(text, 'medication') == canonical
+
+def test_release_suffix_only_after_a_name(canonicalizer):
+    assert canonicalizer.canonical('ER', 'medication') == 'er'
+    assert canonicalizer.canonical('cr tablets', 'medication') == 'cr'
+
+def test_relationships_point_at_the_entities_of_the_document():
+    line = {'document_id': 'doc', 'text': '', 'extractions': [
+        {'extraction_class': 'relationship', 'extraction_text': 'olanzapine for bipolar disorder',
+         'attributes': {'entity_1': 'Olanzapine', 'entity_2': 'bipolar disorder'}, 'alignment_status': 'match_exact'},
+        {'extraction_class': 'medication', 'extraction_text': 'Olanzapine 10 mg', 'char_interval': {},
+         'alignment_status': 'match_exact'},
+        {'extraction_class': 'condition', 'extraction_text': 'Bipolar affective disorder', 'char_interval': {},
+         'alignment_status': 'match_exact'},
+        {'extraction_class': 'condition', 'extraction_text': 'oral cancer', 'char_interval': {},
+         'alignment_status': 'match_exact'},
+    ]}
+    graph = GraphBuilder.fromAnnotatedDocument(line).graphData()
+    assert [entity['_key'] for entity in graph['entities']] == ['olanzapine', 'bipolar_affective_disorder', 'oral_cancer']
+    associated = [edge for edge in graph['relationships'] if edge['relationship_type'] == 'associated']
+    assert [(edge['_from'], edge['_to']) for edge in associated] == [
+        ('entities/olanzapine', 'entities/bipolar_affective_disorder')]
@@ -0,0 +1,81 @@
+import time
+import numpy as np
+import pytest
+import langextract as lx
+from extractors import registry
+from extractors.example_bank import ExampleBank, exportExamples, splitExample
+from extractors.prompt_budget import extractionSpans
+
+TOPICS = [
+    'patient takes olanzapine for schizophrenia and lithium for bipolar disorder',
+    'fracture of the left femur after a fall from a ladder, treated with surgery',
+    'type 2 diabetes managed with metformin and insulin, blood glucose monitored',
+    'asthma exacerbation treated with salbutamol inhaler and prednisolone',
+    'motor vehicle accident with head injury and loss of consciousness',
+    'hypothyroidism on levothyroxine, thyroid function tests normal',
+    'depression treated with sertraline, sleep and appetite improved',
+    'burns to the right arm from boiling water, dressed daily',
+]
+
+def example(text):
+    return lx.data.ExampleData(text=text, extractions=[])
+
+@pytest.fixture
+def bank():
+    return ExampleBank([example(text) for text in TOPICS], k=3)
+
+def test_select_picks_the_nearest_k(bank):
+    note = 'started metformin for type 2 diabetes, insulin at night, glucose checked twice a day'
+    picked = bank.select(note)
+    assert len(picked) == 3 < len(bank)
+    assert picked[0].text == TOPICS[2]
+
+    # same as ranking every example by cosine similarity
+    query = bank.normalize(bank.termFrequencies(note) * bank.idf)
+    scores = [float(bank.matrix[i] @ query) for i in range(len(bank))]
+    ranking = sorted(range(len(bank)), key=lambda i: -scores[i])
+    assert [example.text for example in picked] == [TOPICS[i] for i in ranking[:3]]
+
+def test_select_is_capped_by_the_bank_size(bank):
+    assert len(bank.select('anything', k=100)) == len(TOPICS)
+    assert ExampleBank([], k=2).select('anything') == []
+
+def test_extractor_examples_are_split_in_windows(monkeypatch):
+    monkeypatch.setenv('OPENAI_API_KEY', 'test')
+    extractor = registry.newExtractor('meds')
+    bank = ExampleBank.fromExtractor(extractor, k=2)
+    assert len(bank) > bank.k
+
+    # every extraction in exactly one window, and found in its text unless it wasn't in the
+    # original either (those stay in the first window)
+    original = [extraction.extraction_text for example in extractor.examples for extraction in example.extractions]
+    windows = [extraction.extraction_text for example in bank.examples for extraction in example.extractions]
+    assert sorted(windows) == sorted(original)
+    unlocated = [span is None for example in extractor.examples for span in extractionSpans(example.text, example.extractions)]
+    first, *rest = bank.examples
+    assert sum(span is None for span in extractionSpans(first.text, first.extractions)) == sum(unlocated)
+    for window in rest:
+        assert window.extractions
+        assert None not in extractionSpans(window.text, window.extractions)
+
+def test_split_keeps_short_examples_whole():
+    extraction = lx.data.Extraction(extraction_class='medication', extraction_text='olanzapine')
+    short = lx.data.ExampleData(text='Takes olanzapine. Sleeps well.', extractions=[extraction])
+    assert [window.text for window in splitExample(short)] == [short.text]
+
+def test_directory_index_is_reused_until_the_examples_change(tmp_path):
+    exportExamples([example(text) for text in TOPICS[:4]], str(tmp_path))
+    bank = ExampleBank.fromDirectory(str(tmp_path), k=2)
+    assert [e.text for e in bank.examples] == TOPICS[:4]
+    index = tmp_path / ExampleBank.INDEX
+    built = index.stat().st_mtime_ns
+
+    again = ExampleBank.fromDirectory(str(tmp_path), k=2)
+    assert index.stat().st_mtime_ns == built
+    assert np.array_equal(again.matrix, bank.matrix)
+
+    time.sleep(0.01)
+    exportExamples([example(text) for text in TOPICS[4:6]], str(tmp_path), prefix='more')
+    grown = ExampleBank.fromDirectory(str(tmp_path), k=2)
+    assert len(grown) == 6 and grown.matrix.shape[0] == 6
+    assert index.stat().st_mtime_ns != built
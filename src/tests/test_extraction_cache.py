@@ -0,0 +1,65 @@
+import os
+import langextract as lx
+from extractors.extraction_cache import ExtractionCache
+
+def document(i):
+    return lx.data.AnnotatedDocument(document_id=f"doc_{i}", text='x' * 200, extractions=[])
+
+def entrySize(cache):
+    return sum(entry.stat().st_size for entry in os.scandir(cache.cacheDir) if entry.name.endswith('.json'))
+
+def countScans(cache):
+    scans = []
+    scan = cache.scan
+    def counted():
+        scans.append(1)
+        return scan()
+    cache.scan = counted
+    return scans
+
+def test_put_keeps_a_running_size_and_only_lists_the_directory_when_over(tmp_path):
+    cache = ExtractionCache(str(tmp_path), maxBytes=10 ** 6)
+    scans = countScans(cache)
+    for i in range(20):
+        cache.put(f"key{i}", document(i))
+    assert scans == []
+    assert cache.stats()['entries'] == 20
+    assert cache.stats()['bytes'] == entrySize(cache)
+
+    # replacing an entry doesn't count it twice
+    cache.put('key0', document(0))
+    assert cache.stats()['entries'] == 20
+    assert cache.stats()['bytes'] == entrySize(cache)
+    assert cache.get('key0').document_id == 'doc_0'
+
+def test_eviction_goes_below_the_limit_least_recently_used_first(tmp_path):
+    cache = ExtractionCache(str(tmp_path), maxBytes=10 ** 6)
+    for i in range(10):
+        cache.put(f"key{i}", document(i))
+    size = cache.stats()['bytes'] // 10
+    for i in range(10):
+        os.utime(cache.pathFor(f"key{i}"), (i, i))
+
+    cache.maxBytes = 10 * size + size // 2
+    scans = countScans(cache)
+    cache.put('key10', document(10))
+    assert scans == [1]
+    assert cache.stats()['bytes'] <= cache.maxBytes * 0.9
+    assert cache.stats()['bytes'] == entrySize(cache)
+    assert cache.get('key0') is None and cache.get('key10') is not None
+
+    # room was made, the next write doesn't evict again
+    cache.put('key11', document(11))
+    assert scans == [1]
+
+def test_rescans_every_n_puts(tmp_path):
+    cache = ExtractionCache(str(tmp_path), maxBytes=10 ** 6)
+    cache.RESCAN = 5
+    scans = countScans(cache)
+    # written by another process
+    with open(cache.pathFor('other'), 'w') as f:
+        f.write('{}')
+    for i in range(5):
+        cache.put(f"key{i}", document(i))
+    assert scans == [1]
+    assert cache.stats()['entries'] == 6
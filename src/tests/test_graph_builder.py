@@ -0,0 +1,102 @@
+import copy, re
+from benchmarks.bench_graph_builder import LinearScanBuilder
+from benchmarks.synthetic import syntheticDocument
+from graph_builder import GraphBuilder, MAX_KEY_BYTES, arangoKey, extractionEdgeKey, mentionKey
+from processOutput import ProcessOutput
+from storage.memory_store import MemoryGraphStore
+
+# what ArangoDB accepts in a _key
+VALID_KEY = re.compile(r"^[A-Za-z0-9_\-:.@()+,=;$!*'%]{1,254}$")
+
+def extraction(cls, text, start=None, end=None, **attributes):
+    return {
+        'extraction_class': cls,
+        'extraction_text': text,
+        'char_interval': {'start_pos': start, 'end_pos': end} if start is not None else None,
+        'alignment_status': 'match_exact',
+        'attributes': attributes or None,
+    }
+
+def test_duplicated_entities_are_added_once():
+    builder = GraphBuilder('record_1', 'Olanzapine 10 mg, then olanzapine.')
+    assert builder.addEntity(extraction('medication', 'Olanzapine 10 mg', 0, 16))
+    assert not builder.addEntity(extraction('medication', 'olanzapine', 23, 33))
+    assert not builder.addEntity(extraction('relationship', 'olanzapine for schizophrenia'))
+    assert [entity['_key'] for entity in builder.entities] == ['olanzapine']
+    assert builder.entityKeys == {'olanzapine'}
+    # one document -> entity edge per entity
+    assert len(builder.relationships) == 1
+
+def test_key_index_builds_the_same_graph_as_the_linear_scan():
+    line = syntheticDocument(3, extractions=300)
+    indexed = GraphBuilder.fromAnnotatedDocument(copy.deepcopy(line)).graphData()
+    scanned = LinearScanBuilder.fromAnnotatedDocument(copy.deepcopy(line)).graphData()
+    for name in ['entities', 'relationships']:
+        assert [item['_key'] for item in indexed[name]] == [item['_key'] for item in scanned[name]]
+    # the synthetic document repeats entities, so dedup was exercised
+    assert len(indexed['entities']) < len([e for e in line['extractions'] if e['extraction_class'] != 'relationship'])
+
+def test_arango_key_percent_encodes_and_never_collides():
+    assert arangoKey('olanzapine') == 'olanzapine'
+    assert arangoKey('a/b') == 'a%2Fb'
+    assert arangoKey('é') == '%C3%A9'
+    # '%' is encoded too, so an already encoded text gets another key
+    assert arangoKey('a%2Fb') == 'a%252Fb' != arangoKey('a/b')
+    for text in ['a/b', 'x y', 'ü#?', 'dose 1/2 tab']:
+        assert VALID_KEY.match(arangoKey(text))
+
+def test_long_keys_fall_back_to_a_digest():
+    long, other = 'a' * 300, 'a' * 299 + 'b'
+    assert len(arangoKey(long)) <= MAX_KEY_BYTES
+    assert VALID_KEY.match(arangoKey(long))
+    assert arangoKey(long) != arangoKey(other)
+    assert arangoKey(long) == arangoKey('a' * 300)
+
+def test_mention_keys_are_deterministic():
+    headache = extraction('symptom', 'Headache ', 50, 58)
+    assert mentionKey('record_1', headache) == mentionKey('record_1', extraction('symptom', 'headache', 50, 58))
+    assert mentionKey('record_1', headache).startswith('symptom_')
+    assert VALID_KEY.match(mentionKey('record_1', headache))
+    # another place or document is another mention
+    assert mentionKey('record_1', headache) != mentionKey('record_1', extraction('symptom', 'headache', 70, 78))
+    assert mentionKey('record_1', headache) != mentionKey('record_2', headache)
+
+def test_reingesting_a_document_keeps_its_entities():
+    line = syntheticDocument(5, extractions=60)
+    first = GraphBuilder.fromAnnotatedDocument(copy.deepcopy(line))
+    again = GraphBuilder.fromAnnotatedDocument(copy.deepcopy(line))
+    assert [e['_key'] for e in first.entities] == [e['_key'] for e in again.entities]
+
+    output = ProcessOutput(store=MemoryGraphStore())
+    output.storeGraph(first.graphData())
+    entities = output.store.counts()['entities']
+    output.storeGraph(again.graphData())
+    assert output.store.counts()['entities'] == entities
+
+DOCUMENT = {
+    'document_id': 'record_1',
+    'text': 'Olanzapine 10 mg for schizophrenia, complained of headache.',
+    'extractions': [
+        extraction('medication', 'Olanzapine 10 mg', 0, 16),
+        extraction('condition', 'schizophrenia', 21, 34),
+        extraction('symptom', 'headache', 50, 58),
+        extraction('relationship', 'olanzapine for schizophrenia', entity_1='Olanzapine', entity_2='schizophrenia'),
+    ],
+}
+
+def test_document_entity_edges_have_stable_keys():
+    assert extractionEdgeKey('record_1', 'olanzapine') == extractionEdgeKey('record_1', 'olanzapine')
+    assert extractionEdgeKey('record_1', 'olanzapine') != extractionEdgeKey('record_2', 'olanzapine')
+    assert VALID_KEY.match(extractionEdgeKey('record_1', 'olanzapine'))
+
+    builder = GraphBuilder.fromAnnotatedDocument(copy.deepcopy(DOCUMENT))
+    edges = [edge for edge in builder.relationships if edge['relationship_type'] == 'extraction']
+    assert [edge['_key'] for edge in edges] == [extractionEdgeKey('record_1', entity['_key']) for entity in builder.entities]
+    assert all(edge['_from'] == 'documents/record_1' for edge in edges)
+
+def test_restoring_a_document_leaves_the_edges_unchanged():
+    output = ProcessOutput(store=MemoryGraphStore())
+    output.storeGraph(GraphBuilder.fromAnnotatedDocument(copy.deepcopy(DOCUMENT)).graphData())
+    counts = output.store.counts()
+    output.storeGraph(GraphBuilder.fromAnnotatedDocument(copy.deepcopy(DOCUMENT)).graphData())
+    assert output.store.counts() == counts
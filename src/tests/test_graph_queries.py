@@ -0,0 +1,109 @@
+import re, time
+from graph_queries import GraphQueries, QueryCache
+
+class FakeAql():
+    # answers every query with the rows given, and records them
+    def __init__(self, rows):
+        self.rows = rows
+        self.queries = []
+
+    def execute(self, aql, bind_vars=None, batch_size=None):
+        self.queries.append((aql, bind_vars))
+        return iter([dict(row) for row in self.rows])
+
+class FakeDatabase():
+    def __init__(self, rows):
+        self.aql = FakeAql(rows)
+
+NEIGHBORS = [{'key': 'lithium', 'extraction_class': 'medication', 'extraction_text': 'lithium', 'depth': 1}]
+
+def test_results_are_cached_until_an_involved_vertex_changes():
+    db = FakeDatabase(NEIGHBORS)
+    queries = GraphQueries(db, cache=QueryCache())
+    assert queries.neighbors('olanzapine') == NEIGHBORS
+    assert queries.neighbors('olanzapine') == NEIGHBORS
+    assert len(db.aql.queries) == 1
+
+    # unrelated vertices keep it
+    queries.cache.invalidate(['entities/metformin'])
+    queries.neighbors('olanzapine')
+    assert len(db.aql.queries) == 1
+
+    # the argument, or a vertex of the result, drop it
+    queries.cache.invalidate(['entities/lithium'])
+    queries.neighbors('olanzapine')
+    assert len(db.aql.queries) == 2
+    queries.cache.invalidate(['entities/olanzapine'])
+    queries.neighbors('olanzapine')
+    assert len(db.aql.queries) == 3
+
+def test_callers_cannot_change_the_cached_result():
+    queries = GraphQueries(FakeDatabase(NEIGHBORS), cache=QueryCache())
+    first = queries.neighbors('olanzapine')
+    first[0]['key'] = 'changed'
+    first.clear()
+    again = queries.neighbors('olanzapine')
+    again[0]['depth'] = 5
+    assert queries.neighbors('olanzapine') == NEIGHBORS
+
+def test_lru_and_ttl():
+    cache = QueryCache(maxsize=2, ttl=0.05)
+    cache.put('a', (1,), {'entities/a'})
+    cache.put('b', (2,), {'entities/b'})
+    cache.get('a')
+    cache.put('c', (3,), {'entities/c'})
+    assert cache.get('b') is None and cache.get('a') == (1,)
+    assert 'entities/b' not in cache.byVertex
+    time.sleep(0.06)
+    assert cache.get('a') is None
+
+class TraversalAql():
+    # runs the neighbors traversal over a few edges the way ArangoDB does: breadth first, each
+    # vertex visited once, PRUNE evaluated on every vertex (the start one too, with a null
+    # edge) and the FILTER on the ones in the depth range. The conditions are the query's own.
+    EDGES = [
+        ('entities/olanzapine', 'entities/schizophrenia', 'associated'),
+        ('entities/schizophrenia', 'entities/insomnia', 'associated'),
+        ('documents/record_1', 'entities/olanzapine', 'extraction'),
+        ('documents/record_1', 'entities/headache', 'extraction'),
+    ]
+
+    def __init__(self):
+        self.expanded = []
+
+    @staticmethod
+    def condition(aql, clause):
+        # the AQL condition of the clause as a Python expression of edge
+        text = re.search(rf"^\s*{clause} (.+)$", aql, re.MULTILINE).group(1)
+        text = re.sub(r"edge\.(\w+)", r"attribute(edge, '\1')", text)
+        text = text.replace(' AND ', ' and ').replace(' OR ', ' or ').replace('null', 'None')
+        return lambda edge: eval(text, {'attribute': lambda document, name: document and document.get(name), 'edge': edge})
+
+    def execute(self, aql, bind_vars=None, batch_size=None):
+        prune, keep = self.condition(aql, 'PRUNE'), self.condition(aql, 'FILTER')
+        rows, seen = [], {bind_vars['start']}
+        frontier = [(bind_vars['start'], None, 0)]
+        while frontier:
+            vertex, edge, depth = frontier.pop(0)
+            if depth >= 1 and keep(edge):
+                rows.append({'key': vertex.split('/')[1], 'depth': depth})
+            if prune(edge) or depth == bind_vars['depth']:
+                continue
+            self.expanded.append(vertex)
+            for start, end, kind in self.EDGES:
+                if vertex in (start, end):
+                    other = end if vertex == start else start
+                    if other not in seen:
+                        seen.add(other)
+                        frontier.append((other, {'relationship_type': kind}, depth + 1))
+        return iter(rows)
+
+def test_neighbors_only_expands_associated_edges():
+    db = FakeDatabase([])
+    db.aql = TraversalAql()
+    queries = GraphQueries(db, cache=None)
+    assert queries.neighbors('olanzapine') == [{'key': 'schizophrenia', 'depth': 1}]
+    assert queries.neighbors('olanzapine', depth=2) == [{'key': 'schizophrenia', 'depth': 1},
+                                                        {'key': 'insomnia', 'depth': 2}]
+    # the document reached through an extraction edge is not expanded
+    assert 'documents/record_1' not in db.aql.expanded
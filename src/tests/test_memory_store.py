@@ -0,0 +1,93 @@
+import copy
+from benchmarks.synthetic import syntheticDocument
+from processOutput import ProcessOutput
+from storage.memory_store import MemoryGraphStore
+
+def edge(source, target, key=None, kind='associated'):
+    relationship = {'_from': source, '_to': target, 'relationship_type': kind}
+    if key:
+        relationship['_key'] = key
+    return {'relationship': relationship, 'count': 1}
+
+def test_upserts_merge_entities_and_count_edges():
+    store = MemoryGraphStore()
+    store.upsertEntities([{'_key': 'olanzapine', 'extraction_class': 'medication'}])
+    store.upsertEntities([{'_key': 'olanzapine', 'canonical_name': 'olanzapine'}])
+    store.upsertRelationships([edge('entities/a', 'entities/b', 'a_assoc_b')])
+    store.upsertRelationships([{'relationship': edge('entities/a', 'entities/b', 'a_assoc_b')['relationship'], 'count': 2}])
+
+    assert store.entities['olanzapine'] == {'_key': 'olanzapine', 'extraction_class': 'medication', 'canonical_name': 'olanzapine'}
+    assert [(vertex, data['count']) for vertex, data in store.neighbors('entities/a')] == [('entities/b', 3)]
+    assert store.neighbors('entities/b', 'inbound')[0][0] == 'entities/a'
+
+def test_edges_without_key_keep_unique_keys_after_compact():
+    store = MemoryGraphStore()
+    store.upsertRelationships([edge('entities/a', 'entities/b'), edge('entities/a', 'entities/c'),
+                               edge('entities/b', 'entities/c', 'b_assoc_c')])
+    store.retractDocuments([], [], [{'key': 'b_assoc_c', 'count': 1}])
+    store.removeEdge(store.edgePositions['edge_0'])
+    store.compact()
+    store.upsertRelationships([edge('entities/x', 'entities/y')])
+
+    assert sorted(store.edgePositions) == ['edge_1', 'edge_2']
+    assert [vertex for vertex, _ in store.neighbors('entities/a')] == ['entities/c']
+    assert [vertex for vertex, _ in store.neighbors('entities/x')] == ['entities/y']
+
+def test_compact_keeps_the_adjacency():
+    store = MemoryGraphStore()
+    store.upsertRelationships([edge('entities/a', f"entities/{i}", f"a_{i}") for i in range(10)])
+    for i in range(0, 10, 2):
+        store.removeEdge(store.edgePositions[f"a_{i}"])
+    before = store.neighbors('entities/a')
+    store.compact()
+    assert store.neighbors('entities/a') == before
+    assert len(store.edgeData) == store.counts()['relationships'] == 5
+
+def test_retracting_many_documents_builds_the_csr_once():
+    po = ProcessOutput(store=MemoryGraphStore())
+    documents = [syntheticDocument(i, 20) for i in range(20)]
+    po.ingestDocuments(documents, 'v1', batchSize=20)
+
+    builds = []
+    buildCSR = po.store.buildCSR
+    po.store.buildCSR = lambda: builds.append(1) or buildCSR()
+    po.ingestDocuments([dict(document, extractions=document['extractions'][:5]) for document in documents], 'v2', batchSize=20)
+    assert len(builds) == 1
+
+def test_replacing_a_document_matches_ingesting_the_new_version():
+    first, second = syntheticDocument(1, 30), syntheticDocument(2, 30)
+    changed = dict(first, extractions=first['extractions'][::3])
+
+    replaced = ProcessOutput(store=MemoryGraphStore())
+    # building the graph adds keys to the extractions, each ingestion gets its own copy
+    replaced.ingestDocuments(copy.deepcopy([first, second]), 'v1', batchSize=10)
+    # unchanged documents are skipped
+    assert replaced.ingestDocuments(copy.deepcopy([first, second]), 'v1', batchSize=10)[1:] == (0, 2)
+    replaced.ingestDocuments(copy.deepcopy([changed]), 'v2', batchSize=10)
+
+    fresh = ProcessOutput(store=MemoryGraphStore())
+    fresh.ingestDocuments(copy.deepcopy([changed, second]), 'v2', batchSize=10)
+
+    def associated(store):
+        return {key: store.edgeCount[position] for key, position in store.edgePositions.items()
+                if store.edgeData[position]['relationship_type'] == 'associated'}
+    def extraction(store):
+        return sorted((key, neighbor) for key in store.documents
+                      for neighbor, _ in store.neighbors(f"documents/{key}", 'outbound'))
+
+    assert associated(replaced.store) == associated(fresh.store)
+    assert extraction(replaced.store) == extraction(fresh.store)
+    assert replaced.store.ledger[first['document_id']]['hash'] == fresh.store.ledger[first['document_id']]['hash']
+
+def test_snapshot_round_trip(tmp_path):
+    po = ProcessOutput(store=MemoryGraphStore())
+    po.ingestDocuments([syntheticDocument(i, 20) for i in range(5)], 'v1', batchSize=5)
+    po.store.upsertRelationships([edge('entities/a', 'entities/b')])
+    path = str(tmp_path / 'graph.pkl')
+    po.store.snapshot(path)
+
+    loaded = MemoryGraphStore.load(path)
+    assert loaded.counts() == po.store.counts()
+    assert loaded.neighbors('documents/doc_0_0') == po.store.neighbors('documents/doc_0_0')
+    loaded.upsertRelationships([edge('entities/c', 'entities/d')])
+    assert loaded.counts()['relationships'] == po.store.counts()['relationships'] + 1
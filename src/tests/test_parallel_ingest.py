@@ -0,0 +1,55 @@
+import json
+import pytest
+from benchmarks.synthetic import syntheticDocument
+from parallel_ingest import ParallelIngest, expandPaths
+from processOutput import ProcessOutput
+from storage.memory_store import MemoryGraphStore
+
+def edgeCounts(store):
+    return {key: store.edgeCount[position] for key, position in store.edgePositions.items()}
+
+def changed(document):
+    # the same document, with every other extraction dropped
+    return dict(document, extractions=document['extractions'][::2])
+
+def test_directory_takes_every_jsonl_and_skips_other_lines(tmp_path, capfd):
+    for i in range(3):
+        (tmp_path / f"sample_output_meds{i}.jsonl").write_text(json.dumps(syntheticDocument(i)) + '\n')
+    (tmp_path / 'metrics.jsonl').write_text(json.dumps({'event': 'stage', 'stage': 'extract', 'seconds': 1.2}) + '\n')
+    # outputs saved under other names, with lines that are not annotated documents
+    (tmp_path / 'mixed.jsonl').write_text(json.dumps({'event': 'run'}) + '\n' + json.dumps(syntheticDocument(9)) + '\n')
+    (tmp_path / 'notes.txt').write_text('not an output')
+
+    paths = expandPaths([str(tmp_path), str(tmp_path / 'mixed.jsonl')])
+    assert [path.rsplit('/', 1)[1] for path in paths] == ['metrics.jsonl', 'mixed.jsonl', 'sample_output_meds0.jsonl',
+                                                          'sample_output_meds1.jsonl', 'sample_output_meds2.jsonl']
+
+    po = ProcessOutput(store=MemoryGraphStore())
+    summary = ParallelIngest(lambda: po, workers=2, batchSize=2).run(paths, progress=False)
+    assert summary['ingested'] == 4
+    assert po.store.counts()['documents'] == 4
+    assert capfd.readouterr().err.count('not an annotated document') == 2
+
+def test_failed_batch_after_retract_is_ingested_again():
+    document = syntheticDocument(1, 40)
+    # another document with the same associations, so their counts don't drop to zero
+    other = dict(document, document_id='other')
+
+    expected = ProcessOutput(store=MemoryGraphStore())
+    expected.ingestDocuments([other, document], 'v1', batchSize=10)
+    expected.ingestDocuments([changed(document)], 'v2', batchSize=10)
+
+    po = ProcessOutput(store=MemoryGraphStore())
+    po.ingestDocuments([other, document], 'v1', batchSize=10)
+    upsertEntities = po.store.upsertEntities
+    def failing(entities):
+        raise RuntimeError('connection lost')
+    po.store.upsertEntities = failing
+    with pytest.raises(RuntimeError):
+        po.ingestDocuments([changed(document)], 'v2', batchSize=10)
+    po.store.upsertEntities = upsertEntities
+    # the retry does not take the first version's associations back a second time
+    po.ingestDocuments([changed(document)], 'v2', batchSize=10)
+
+    assert edgeCounts(po.store) == edgeCounts(expected.store)
+    assert po.store.counts() == expected.store.counts()
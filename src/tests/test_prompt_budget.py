@@ -0,0 +1,32 @@
+import langextract as lx
+from extractors import registry
+from extractors.prompt_budget import extractionSpans, trimExample
+
+def test_trimmed_examples_keep_their_extractions_aligned(monkeypatch):
+    monkeypatch.setenv('OPENAI_API_KEY', 'test')
+    for name in registry.names():
+        for example in registry.newExtractor(name).examples:
+            trimmed = trimExample(example, context=150)
+            assert len(trimmed.text) < len(example.text)
+            assert trimmed.extractions is example.extractions
+            before = extractionSpans(example.text, example.extractions)
+            after = extractionSpans(trimmed.text, trimmed.extractions)
+            assert [span is None for span in after] == [span is None for span in before]
+
+def test_context_and_separator():
+    text = 'Intro words here. ' * 30 + 'Takes olanzapine daily. ' + 'Filler text again. ' * 30 + 'Started lithium.'
+    example = lx.data.ExampleData(text=text, extractions=[
+        lx.data.Extraction(extraction_class='medication', extraction_text='olanzapine'),
+        lx.data.Extraction(extraction_class='medication', extraction_text='lithium'),
+    ])
+    trimmed = trimExample(example, context=20)
+    assert trimmed.text.count(' ... ') == 1
+    first, second = trimmed.text.split(' ... ')
+    assert 'olanzapine' in first and 'lithium' in second
+    # whole words around the extraction
+    assert all(word in text.split() for word in first.split())
+
+def test_examples_without_located_extractions_are_kept():
+    example = lx.data.ExampleData(text='Sixteen year old girl.', extractions=[
+        lx.data.Extraction(extraction_class='demographics', extraction_text='16 years old')])
+    assert trimExample(example) is example
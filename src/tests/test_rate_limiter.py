@@ -0,0 +1,84 @@
+import threading, time
+from extractors import rate_limiter
+from extractors.rate_limiter import RateLimiter, isThrottle
+
+class ProviderError(Exception):
+    def __init__(self, message, status_code=None, original=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.original = original
+
+class RateLimitError(Exception):
+    pass
+
+def test_throttles_are_found_by_status_or_type_not_by_message():
+    assert isThrottle(ProviderError('slow down', status_code=429))
+    assert isThrottle(ProviderError('wrapped', original=RateLimitError('limit')))
+    assert not isThrottle(ProviderError('invalid value 429 in field quota_project'))
+    assert not isThrottle(ValueError('rate limit'))
+
+def test_requests_in_flight_stay_under_the_limit():
+    limiter = RateLimiter(rpm=60000, tpm=10 ** 9, maxInFlight=3)
+    running, peak, lock = [0], [0], threading.Lock()
+
+    def request():
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.01)
+        with lock:
+            running[0] -= 1
+
+    threads = [threading.Thread(target=limiter.call, args=(request,)) for _ in range(30)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert peak[0] == 3
+    assert limiter.inFlight == 0
+
+def test_changing_max_in_flight_keeps_the_slots_taken():
+    limiter = RateLimiter(rpm=60000, tpm=10 ** 9, maxInFlight=2)
+    limiter.acquire(1, 0)
+    limiter.acquire(1, 0)
+    limiter.setMaxInFlight(3)
+    assert limiter.tryAcquire(1, 0) == 0.0
+    assert limiter.tryAcquire(1, 0) is None
+    for _ in range(3):
+        limiter.release()
+    assert limiter.inFlight == 0
+
+def test_throttled_call_is_retried():
+    limiter = RateLimiter(rpm=60000, tpm=10 ** 9)
+    attempts = []
+
+    def request():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise ProviderError('too many', status_code=429)
+        return 'ok'
+
+    limiter.backoff = 0.01
+    assert limiter.call(request) == 'ok'
+    assert len(attempts) == 2 and limiter.throttles == 1
+
+def test_every_model_request_of_an_extraction_goes_through_the_limiter(monkeypatch, tmp_path):
+    monkeypatch.setenv('OPENAI_API_KEY', 'test')
+    from extractors import registry
+    from benchmarks.replay_provider import ReplayModel
+    from benchmarks.synthetic import syntheticNote
+
+    extractor = registry.newExtractor('meds')
+    extractor.setBypassCache(True)
+    extractor.setChunking(maxCharBuffer=500)
+    extractor.setModelFactory(lambda params, examples: ReplayModel(str(tmp_path / 'none.jsonl'), missing='template'))
+    # the shared limiter of the model, put back as it was after the test
+    limiter = RateLimiter(rpm=60000, tpm=10 ** 9, maxInFlight=2)
+    monkeypatch.setitem(rate_limiter._limiters, extractor.extractionParams()['model_id'], limiter)
+    calls = []
+    call = limiter.call
+    monkeypatch.setattr(limiter, 'call', lambda *args, **kwargs: calls.append(1) or call(*args, **kwargs))
+
+    extractor.setInputText(syntheticNote(0))
+    assert extractor.extract()
+    assert len(calls) == extractor.lastChunkStats['requests'] > 1
@@ -0,0 +1,68 @@
+import gzip, json, os
+import pytest
+from result_store import INDEX, ResultStore
+
+def document(i, version=0):
+    return {'document_id': f"record_{i}", 'text': f"note {i} " * 20, 'version': version,
+            'extractions': [{'extraction_class': 'medication', 'extraction_text': 'olanzapine'}] * (i % 3)}
+
+def test_append_and_get(tmp_path):
+    store = ResultStore(str(tmp_path))
+    entries = [store.append(document(i)) for i in range(5)]
+    assert ResultStore.isStore(str(tmp_path))
+    assert [entry['extractions'] for entry in entries] == [0, 1, 2, 0, 1]
+
+    # a new instance reads the index
+    reopened = ResultStore(str(tmp_path))
+    assert len(reopened) == 5
+    assert reopened.get('record_3') == document(3)
+    with pytest.raises(KeyError):
+        reopened.get('record_9')
+
+def test_shards_rotate_and_stay_valid_gzip(tmp_path):
+    store = ResultStore(str(tmp_path), maxShardBytes=200)
+    for i in range(6):
+        store.append(document(i))
+    shards = store.shards()
+    assert len(shards) > 1
+    with gzip.open(os.path.join(str(tmp_path), shards[0]), 'rt') as f:
+        assert json.loads(f.readline())['document_id'] == 'record_0'
+    assert [d['document_id'] for d in ResultStore(str(tmp_path)).iterDocuments()] == [f"record_{i}" for i in range(6)]
+
+def test_appending_again_supersedes(tmp_path):
+    store = ResultStore(str(tmp_path))
+    store.append(document(1))
+    store.append(document(2))
+    store.append(document(1, version=1))
+
+    reopened = ResultStore(str(tmp_path))
+    assert len(reopened) == 2
+    assert reopened.get('record_1')['version'] == 1
+    assert [(d['document_id'], d['version']) for d in reopened.iterDocuments()] == [('record_2', 0), ('record_1', 1)]
+    assert [(d['document_id'], d['version']) for d in reopened.iterDocuments(latestOnly=False)] == [
+        ('record_1', 0), ('record_2', 0), ('record_1', 1)]
+
+def test_a_partly_written_index_line_is_read_once_complete(tmp_path):
+    store = ResultStore(str(tmp_path))
+    store.append(document(1))
+    entry = store.append(document(2))
+
+    # a writer interrupted in the middle of its index line
+    path = os.path.join(str(tmp_path), INDEX)
+    with open(path, 'rb') as f:
+        lines = f.readlines()
+    with open(path, 'wb') as f:
+        f.write(lines[0] + lines[1][:10])
+
+    reader = ResultStore(str(tmp_path))
+    assert reader.documentIds() == ['record_1']
+    assert [d['document_id'] for d in reader.iterDocuments()] == ['record_1']
+
+    with open(path, 'ab') as f:
+        f.write(lines[1][10:])
+    assert reader.documentIds() == ['record_1', 'record_2']
+    assert reader.entries['record_2'] == entry
+
+def test_rejects_unknown_compression(tmp_path):
+    with pytest.raises(ValueError):
+        ResultStore(str(tmp_path), compression='bz2')
@@ -0,0 +1,196 @@
+import argparse, glob, html, json, os, sys
+from functools import lru_cache
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+from result_store import ResultStore
+
+# Renders saved extractions (the JSONL written by LangExtractor.saveResults) on demand,
+# instead of writing an HTML page per record during extraction.
+#
+# One page per file, written next to it (sample_output_meds1.jsonl -> sample_view_meds1.html):
+#   % python3 src/visualize.py test_output/sample_output_meds1.jsonl
+# A paginated viewer over every document of the given files, directories (their
+# sample_output_*.jsonl) or globs, each one rendered when it is opened:
+#   % python3 src/visualize.py test_output --serve --port 8090
+# Result stores (see result_store.py) are read through their own index:
+#   % python3 src/visualize.py test_output/results --serve
+
+class DocumentIndex():
+    # Where each document is: (file, offset, length) plus what the listing shows. Built with
+    # one pass over the files, documents are read back with a single pread when opened.
+
+    def __init__(self, paths):
+        self.files = expandPaths(paths)
+        self.entries = []
+        self.stores = {}
+        for path in self.files:
+            if ResultStore.isStore(path):
+                # the store has its own index
+                store = self.stores[path] = ResultStore(path)
+                for document_id in store.documentIds():
+                    self.entries.append({'path': path, 'document_id': document_id,
+                                         'extractions': store.entries[document_id]['extractions'], 'preview': ''})
+                continue
+            offset = 0
+            with open(path, 'rb') as f:
+                for line in f:
+                    if line.strip():
+                        document = json.loads(line)
+                        self.entries.append({
+                            'path': path,
+                            'offset': offset,
+                            'length': len(line),
+                            'document_id': document.get('document_id'),
+                            'extractions': len(document.get('extractions') or []),
+                            'preview': (document.get('text') or '')[:120],
+                        })
+                    offset += len(line)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def load(self, i):
+        entry = self.entries[i]
+        if entry['path'] in self.stores:
+            return self.stores[entry['path']].get(entry['document_id'])
+        fd = os.open(entry['path'], os.O_RDONLY)
+        try:
+            return json.loads(os.pread(fd, entry['length'], entry['offset']))
+        finally:
+            os.close(fd)
+
+def expandPaths(paths):
+    # files, result stores, directories (their sample_output_*.jsonl, not the metrics and
+    # other JSONL that may sit next to them) and glob patterns, in order and without repeats
+    files = []
+    for path in paths:
+        if ResultStore.isStore(path):
+            files.append(path)
+        elif os.path.isdir(path):
+            files.extend(sorted(glob.glob(os.path.join(path, 'sample_output_*.jsonl'))))
+        elif glob.has_magic(path):
+            files.extend(sorted(glob.glob(path, recursive=True)))
+        else:
+            files.append(path)
+    return list(dict.fromkeys(files))
+
+def render(document):
+    # lx.visualize of one saved document, as an HTML fragment
+    import langextract as lx
+    result = lx.visualize(lx.data_lib.dict_to_annotated_document(document))
+    return getattr(result, 'data', result)
+
+def viewPath(path):
+    # where the page of a saved output goes: sample_output_meds1.jsonl -> sample_view_meds1.html
+    directory, name = os.path.split(path)
+    name = os.path.splitext(name)[0]
+    if name.startswith('sample_output_'):
+        name = 'sample_view_' + name[len('sample_output_'):]
+    return os.path.join(directory, name + '.html')
+
+def renderFile(path, output=None):
+    index = DocumentIndex([path])
+    if not len(index):
+        print(f"❌ no documents in {path}")
+        return None
+    # as createHTMLResults did, the first document of the file
+    output = output or viewPath(path)
+    with open(output, 'w') as f:
+        f.write(render(index.load(0)))
+    print(f"html visualization saved to {output}")
+    return output
+
+PAGE = '''<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>{title}</title>
+<style>
+body {{ font-family: sans-serif; margin: 2em; }}
+table {{ border-collapse: collapse; width: 100%; }}
+td, th {{ border-bottom: 1px solid #ddd; padding: 4px 8px; text-align: left; vertical-align: top; }}
+nav {{ margin: 1em 0; }} nav a {{ margin-right: 1em; }}
+.preview {{ color: #555; font-size: 90%; }}
+</style></head><body>{body}</body></html>'''
+
+class Viewer(BaseHTTPRequestHandler):
+    index = None
+    pageSize = 50
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path in ('/', '/index.html'):
+            page = int(parse_qs(url.query).get('page', ['1'])[0])
+            return self.reply(200, self.listing(page))
+        if url.path.startswith('/doc/'):
+            try:
+                i = int(url.path[len('/doc/'):])
+                return self.reply(200, self.document(i))
+            except (ValueError, IndexError):
+                pass
+        self.reply(404, PAGE.format(title='not found', body='<p>not found, <a href="/">back to the index</a></p>'))
+
+    def listing(self, page):
+        pages = max(1, -(-len(self.index) // self.pageSize))
+        page = min(max(1, page), pages)
+        start = (page - 1) * self.pageSize
+        rows = []
+        for i in range(start, min(start + self.pageSize, len(self.index))):
+            entry = self.index.entries[i]
+            rows.append(f'<tr><td>{i}</td><td><a href="/doc/{i}">{html.escape(str(entry["document_id"]))}</a></td>'
+                        f'<td>{entry["extractions"]}</td><td>{html.escape(os.path.basename(entry["path"]))}</td>'
+                        f'<td class="preview">{html.escape(entry["preview"])}</td></tr>')
+        nav = (f'<nav>{"<a href=/?page=%d>previous</a>" % (page - 1) if page > 1 else ""}'
+               f'page {page} of {pages} ({len(self.index)} documents)'
+               f'{" <a href=/?page=%d>next</a>" % (page + 1) if page < pages else ""}</nav>')
+        body = (f'<h1>Extractions</h1>{nav}<table><tr><th>#</th><th>document</th><th>extractions</th>'
+                f'<th>file</th><th>text</th></tr>{"".join(rows)}</table>{nav}')
+        return PAGE.format(title='Extractions', body=body)
+
+    def document(self, i):
+        entry = self.index.entries[i]
+        links = ['<a href="/?page=%d">index</a>' % (i // self.pageSize + 1)]
+        if i > 0:
+            links.append(f'<a href="/doc/{i - 1}">previous</a>')
+        if i + 1 < len(self.index):
+            links.append(f'<a href="/doc/{i + 1}">next</a>')
+        title = html.escape(str(entry['document_id']))
+        body = f'<nav>{"".join(links)}</nav><h2>{title}</h2>{renderCached(i)}'
+        return PAGE.format(title=title, body=body)
+
+    def reply(self, status, page):
+        data = page.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+@lru_cache(maxsize=128)
+def renderCached(i):
+    return render(Viewer.index.load(i))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Visualize saved extractions")
+    parser.add_argument('paths', nargs='+', help='JSONL files, directories or glob patterns')
+    parser.add_argument('--serve', action='store_true', help='start the paginated viewer instead of writing HTML files')
+    parser.add_argument('--port', type=int, default=8090)
+    parser.add_argument('--page-size', type=int, default=50)
+    args = parser.parse_args()
+
+    if not args.serve:
+        for path in expandPaths(args.paths):
+            if ResultStore.isStore(path):
+                print(f"{path} is a result store, browse it with --serve")
+                continue
+            renderFile(path)
+        sys.exit()
+
+    Viewer.index = DocumentIndex(args.paths)
+    Viewer.pageSize = args.page_size
+    server = ThreadingHTTPServer(('127.0.0.1', args.port), Viewer)
+    print(f"{len(Viewer.index)} documents from {len(Viewer.index.files)} files, viewer on http://127.0.0.1:{args.port}/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.shutdown()